@@ -1,61 +1,159 @@
 """
 Scraper - Directorio PlataformaPYME
 https://www.plataformapyme.org/directorio-empresas
-Usa Playwright para manejar la paginación JavaScript (DataTables)
+Usa Playwright para manejar la paginación JavaScript (DataTables).
+Las filas se leen dentro del navegador con la API de DataTables en un solo
+evaluate (arrays de textos por celda), sin serializar el DOM con
+page.content() ni re-parsearlo con BeautifulSoup. Si la tabla es server-side
+se pagina con la misma API esperando el evento draw; si no hay API se leen
+las filas visibles y se espera a que cambien en lugar de dormir.
 """
 
 import asyncio
 import csv
-import re
+import os
+import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
 
+# Módulos compartidos en la raíz del repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from campos_pyme import parsear_detalle
+from recursos import aplicar_perfil, resumen_bloqueos
+from leads_db import LeadStore
+import metricas
+from metricas import etapa, contar, contar_error
+
 URL = "https://www.plataformapyme.org/directorio-empresas"
 OUTPUT = "leads_plataformapyme.csv"
+ESPERA_TABLA_MS = 15000
+ESPERA_PAGINA_MS = 15000
+
+# Texto de un nodo con un salto de línea entre nodos de texto, como
+# get_text(separator="\n") de BeautifulSoup (sirve también con filas fuera del DOM)
+_JS_TEXTO = """
+    const texto = nodo => {
+        const w = document.createTreeWalker(nodo, NodeFilter.SHOW_TEXT);
+        const partes = [];
+        while (w.nextNode()) partes.push(w.currentNode.nodeValue);
+        return partes.join('\\n');
+    };
+    const celdas = fila => Array.from(fila.querySelectorAll('td'), texto);
+    const tabla = document.querySelector('table');
+    const DT = window.DataTable || (window.jQuery && window.jQuery.fn.dataTable);
+    const api = tabla && DT && DT.isDataTable(tabla) ? new DT.Api(tabla) : null;
+    const filasApi = sel => {
+        const filas = [];
+        api.rows(sel).every(function () {
+            const nodo = this.node();
+            if (nodo) return void filas.push(celdas(nodo));
+            // deferRender: la fila no tiene nodo, se usa el valor que mostraría cada celda
+            const fila = this.index();
+            filas.push(api.columns().indexes().toArray().map(c => {
+                const t = document.createElement('template');
+                t.innerHTML = String(api.cell(fila, c).render('display') ?? '');
+                return texto(t.content);
+            }));
+        });
+        return filas;
+    };
+"""
+
+# Espera a que DataTables inicialice la tabla (o a que haya filas, si no hay DataTables)
+JS_TABLA_LISTA = """
+() => {
+    const tabla = document.querySelector('table');
+    const DT = window.DataTable || (window.jQuery && window.jQuery.fn.dataTable);
+    if (!tabla) return false;
+    return DT ? DT.isDataTable(tabla) : tabla.querySelectorAll('tbody tr').length > 0;
+}
+"""
+
+# Todas las filas que tiene DataTables (o las de esta página si es server-side)
+JS_FILAS = "() => {" + _JS_TEXTO + """
+    if (!tabla) return null;
+    if (!api) return {api: false, filas: Array.from(tabla.querySelectorAll('tbody tr'), celdas)};
+    const info = api.page.info();
+    return {api: true, server: !!api.settings()[0].oFeatures.bServerSide, paginas: info.pages, filas: filasApi()};
+}
+"""
+
+# Server-side: pasa a la página n con la API y devuelve sus filas cuando termina el draw
+JS_PAGINA = "([n, espera]) => new Promise((resolve, reject) => {" + _JS_TEXTO + """
+    const timer = setTimeout(() => reject(new Error('timeout esperando draw de la página ' + n)), espera);
+    api.one('draw', () => { clearTimeout(timer); resolve(filasApi({page: 'current'})); });
+    api.page(n).draw('page');
+})
+"""
+
+# Sin API: huella de la primera fila visible, para esperar a que cambie la página
+JS_PRIMERA_FILA = "() => { const f = document.querySelector('table tbody tr'); return f ? f.innerText : ''; }"
+JS_CAMBIO_PAGINA = "(antes) => { const f = document.querySelector('table tbody tr'); return !!f && f.innerText !== antes; }"
 
 def limpiar(t):
     return " ".join(t.split()).strip() if t else ""
 
-def parsear_detalle(texto):
-    def campo(label):
-        m = re.search(rf"{label}:\s*(.+?)(?=Domicilio:|Localidad:|Provincia:|Teléfono:|Sitio Web:|Email:|Condicion Fiscal:|CUIT:|Categoria:|---|$)", texto, re.DOTALL)
-        return limpiar(m.group(1)) if m else ""
+def lead_desde_celdas(celdas):
+    """celdas: textos de cada <td> (el detalle con saltos de línea entre fragmentos)"""
+    campos = parsear_detalle(limpiar(celdas[0]))
     return {
-        "domicilio":   campo("Domicilio"),
-        "provincia":   campo("Provincia"),
-        "telefono":    campo("Teléfono"),
-        "sitio_web":   campo("Sitio Web"),
-        "email":       campo("Email"),
-        "categoria":   campo("Categoria"),
+        "razon_social": limpiar(celdas[1]),
+        "cuit":         limpiar(celdas[2]),
+        "categoria":    limpiar(celdas[3]) or campos["categoria"],
+        "localidad":    limpiar(celdas[4]),
+        "provincia":    campos["provincia"],
+        "domicilio":    campos["domicilio"],
+        "telefono":     campos["telefono"],
+        "sitio_web":    campos["sitio_web"],
+        "email":        campos["email"],
     }
 
-def parsear_filas(filas_html):
-    leads = []
-    for fila in filas_html:
-        celdas = fila.find_all("td") if hasattr(fila, 'find_all') else []
-        if len(celdas) < 5:
-            continue
-        detalle  = limpiar(celdas[0].get_text(separator="\n"))
-        razon    = limpiar(celdas[1].get_text())
-        cuit     = limpiar(celdas[2].get_text())
-        categoria= limpiar(celdas[3].get_text())
-        localidad= limpiar(celdas[4].get_text())
-        campos   = parsear_detalle(detalle)
-        leads.append({
-            "razon_social": razon,
-            "cuit":         cuit,
-            "categoria":    categoria or campos["categoria"],
-            "localidad":    localidad,
-            "provincia":    campos["provincia"],
-            "domicilio":    campos["domicilio"],
-            "telefono":     campos["telefono"],
-            "sitio_web":    campos["sitio_web"],
-            "email":        campos["email"],
-        })
+def leads_de(filas):
+    # Filas con menos de 5 celdas: encabezados o el "sin datos" de DataTables
+    return [lead_desde_celdas(celdas) for celdas in filas if len(celdas) >= 5]
+
+async def paginar_server(page, datos):
+    """Tabla server-side: cada página se pide con la API de DataTables"""
+    leads = leads_de(datos["filas"])
+    for n in range(1, datos["paginas"]):
+        print(f"   📄 Página {n + 1}/{datos['paginas']}...", flush=True)
+        with etapa("pagina_datatables"):
+            filas = await page.evaluate(JS_PAGINA, [n, ESPERA_PAGINA_MS])
+        contar("paginas")
+        leads.extend(leads_de(filas))
+        print(f"   → {len(filas)} empresas (total: {len(leads)})", flush=True)
+    return leads
+
+async def paginar_dom(page, datos):
+    """Sin API de DataTables: filas visibles y botón "Siguiente" hasta la última página"""
+    leads = leads_de(datos["filas"])
+    pagina = 1
+    while True:
+        print(f"   → {len(leads)} empresas hasta la página {pagina}", flush=True)
+        btn_next = page.locator("a.next, button.next, [id*='next'], .paginate_button.next").first
+        try:
+            classes = await btn_next.get_attribute("class", timeout=2000) or ""
+        except Exception as e:
+            contar_error("siguiente_pagina", e)
+            print("✅ No hay más páginas", flush=True)
+            break
+        if "disabled" in classes:
+            print("✅ Última página alcanzada", flush=True)
+            break
+        antes = await page.evaluate(JS_PRIMERA_FILA)
+        try:
+            with etapa("pagina_dom"):
+                await btn_next.click()
+                await page.wait_for_function(JS_CAMBIO_PAGINA, arg=antes, timeout=ESPERA_PAGINA_MS)
+        except Exception as e:
+            print(f"⚠️  La página no cambió después de 'Siguiente' ({e})", flush=True)
+            break
+        pagina += 1
+        contar("paginas")
+        leads.extend(leads_de((await page.evaluate(JS_FILAS))["filas"]))
     return leads
 
 async def scrape():
-    from bs4 import BeautifulSoup
     leads = []
 
     async with async_playwright() as p:
@@ -64,57 +162,36 @@ async def scrape():
             args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
         )
         page = await browser.new_page()
+        await aplicar_perfil(page, "pyme")
         print("📥 Cargando directorio...", flush=True)
-        await page.goto(URL, wait_until="networkidle", timeout=60000)
+        with etapa("descarga"):
+            await page.goto(URL, wait_until="domcontentloaded", timeout=60000)
+        contar("paginas")
 
-        # Esperar a que cargue la tabla DataTables
-        await page.wait_for_selector("table", timeout=15000)
-
-        # Intentar mostrar todos los registros de una (opción "All" en DataTables)
+        # Esperar a que DataTables tome la tabla (sin networkidle ni sleeps fijos)
         try:
-            await page.select_option("select[name*='length']", "-1")
-            await page.wait_for_load_state("networkidle")
-            await asyncio.sleep(3)
-            print("✅ Cargando todos los registros a la vez...", flush=True)
-            html = await page.content()
-            soup = BeautifulSoup(html, "html.parser")
-            tabla = soup.find("table")
-            filas = tabla.find_all("tr")[1:]
-            leads = parsear_filas(filas)
-            print(f"✅ {len(leads)} empresas encontradas", flush=True)
+            await page.wait_for_function(JS_TABLA_LISTA, timeout=ESPERA_TABLA_MS)
         except Exception as e:
-            print(f"⚠️  No se pudo cargar todo junto, paginando... ({e})", flush=True)
-
-            # Paginar página por página
-            pagina = 1
-            while True:
-                print(f"   📄 Página {pagina}...", flush=True)
-                html = await page.content()
-                soup = BeautifulSoup(html, "html.parser")
-                tabla = soup.find("table")
-                if not tabla:
-                    break
-                filas = tabla.find_all("tr")[1:]
-                nuevos = parsear_filas(filas)
-                leads.extend(nuevos)
-                print(f"   → {len(nuevos)} empresas (total: {len(leads)})", flush=True)
-
-                # Buscar botón "Siguiente"
-                try:
-                    btn_next = page.locator("a.next, button.next, [id*='next'], .paginate_button.next")
-                    classes = await btn_next.get_attribute("class") or ""
-                    if "disabled" in classes:
-                        print("✅ Última página alcanzada", flush=True)
-                        break
-                    await btn_next.click()
-                    await page.wait_for_load_state("networkidle")
-                    await asyncio.sleep(1.5)
-                    pagina += 1
-                except Exception:
-                    print("✅ No hay más páginas", flush=True)
-                    break
+            contar_error("espera_tabla", e)
+            print(f"⚠️  DataTables no inicializó a tiempo, se lee lo que haya ({e})", flush=True)
+
+        with etapa("extraccion"):
+            datos = await page.evaluate(JS_FILAS)
+        if datos is None:
+            print("❌ No se encontró la tabla", flush=True)
+        elif not datos["api"]:
+            print("⚠️  Sin API de DataTables, paginando por el DOM...", flush=True)
+            leads = await paginar_dom(page, datos)
+        elif datos["server"] and datos["paginas"] > 1:
+            print(f"✅ DataTables server-side: {datos['paginas']} páginas por la API", flush=True)
+            leads = await paginar_server(page, datos)
+        else:
+            leads = leads_de(datos["filas"])
+        print(f"✅ {len(leads)} empresas encontradas", flush=True)
 
         await browser.close()
+    print(f"🚫 Recursos: {resumen_bloqueos()}", flush=True)
+    print(f"📈 Etapas: {metricas.resumen()}", flush=True)
     return leads
 
 def guardar_csv(leads):
@@ -137,5 +214,10 @@ async def main():
     leads = await scrape()
     if leads:
         guardar_csv(leads)
+        store = LeadStore()
+        for lead in leads:
+            store.upsert("pyme", lead)
+        print(f"🗄️  Base de leads: {store.resumen()}", flush=True)
+        store.cerrar()
 
 asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark del extractor de emails: regex sobre todo el HTML + filtro con
+any() anidado (versión anterior de main.py) contra extractor_emails.
+Uso: python benchmarks/bench_extractor_emails.py [carpeta con *.html]
+Sin carpeta genera un corpus sintético con mucho JS/CSS inline.
+"""
+
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from extractor_emails import extraer_emails
+
+def extraer_anterior(texto):
+    if not texto: return []
+    emails = list(set(re.findall(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}", texto)))
+    return [e for e in emails if not any(x in e.lower() for x in
+            ["noreply", "no-reply", "example", "test", "spam", "sentry", "wix", "wordpress"])]
+
+def pagina_sintetica(i):
+    js = "".join(f"function f{j}(a,b){{return a+b*{j};}}var v{j}='{'x' * 40}';" for j in range(random.randint(200, 1500)))
+    css = "".join(f".c{j}{{margin:{j}px;background:url(img/fondo{j}@2x.png)}}" for j in range(random.randint(50, 400)))
+    cuerpo = "".join(f"<p>Párrafo {j} sobre nuestros productos textiles.</p>" for j in range(random.randint(20, 200)))
+    contacto = random.choice([
+        f'<a href="mailto:ventas@empresa{i}.com.ar">Escribinos</a>',
+        f"<p>info [at] empresa{i} [dot] com</p>",
+        f"<p>contacto&#64;empresa{i}.com.ar</p>",
+        "",
+        "",
+    ])
+    return (f"<html><head><style>{css}</style><script>{js}</script>"
+            f"<script>Sentry.init({{dsn:'https://abc123@o1.ingest.sentry.io/1'}})</script></head>"
+            f"<body>{cuerpo}{contacto}</body></html>")
+
+def cargar_corpus():
+    if len(sys.argv) > 1:
+        archivos = sorted(glob.glob(os.path.join(sys.argv[1], "**", "*.htm*"), recursive=True))
+        paginas = []
+        for ruta in archivos:
+            with open(ruta, encoding="utf-8", errors="replace") as f:
+                paginas.append(f.read())
+        return paginas, sys.argv[1]
+    random.seed(1)
+    return [pagina_sintetica(i) for i in range(300)], "corpus sintético"
+
+def medir(funcion, paginas):
+    inicio = time.perf_counter()
+    resultados = [funcion(p) for p in paginas]
+    return time.perf_counter() - inicio, resultados
+
+def main():
+    paginas, origen = cargar_corpus()
+    megas = sum(len(p) for p in paginas) / 1e6
+    print(f"Corpus: {origen} | {len(paginas)} páginas | {megas:.1f} MB")
+
+    for nombre, funcion in [("anterior", extraer_anterior), ("extractor", extraer_emails)]:
+        t, resultados = medir(funcion, paginas)
+        con_email = sum(1 for r in resultados if r)
+        print(f"{nombre:>10}: {t * 1000:8.1f} ms  ({t / len(paginas) * 1000:.2f} ms/página) | páginas con email: {con_email}")
+        if nombre == "anterior":
+            base = t
+    print(f"Speedup: {base / t:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark de parsear_detalle: versión anterior (un re.search por
+campo) contra campos_pyme.parsear_detalle (una sola pasada).
+Uso: python benchmarks/bench_parsear_detalle.py [filas]
+"""
+
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from campos_pyme import parsear_detalle, limpiar
+
+def parsear_detalle_anterior(texto):
+    def campo(label):
+        m = re.search(rf"{label}:\s*(.+?)(?=Domicilio:|Localidad:|Provincia:|Teléfono:|Sitio Web:|Email:|Condicion Fiscal:|CUIT:|Categoria:|---|$)", texto, re.DOTALL)
+        return limpiar(m.group(1)) if m else ""
+    return {
+        "domicilio": campo("Domicilio"),
+        "provincia": campo("Provincia"),
+        "telefono":  campo("Teléfono"),
+        "sitio_web": campo("Sitio Web"),
+        "email":     campo("Email"),
+        "categoria": campo("Categoria"),
+    }
+
+def detalle_sintetico(i):
+    partes = [
+        f"Domicilio: Av. Siempre Viva {i}",
+        f"Localidad: Localidad {i % 97}",
+        "Provincia: Buenos Aires",
+        f"Teléfono: (011) 4{i:03d}-{i % 10000:04d}",
+        f"Sitio Web: www.empresa{i}.com.ar" if i % 3 else "",
+        f"Email: ventas@empresa{i}.com.ar" if i % 2 else "",
+        "Condicion Fiscal: Responsable Inscripto",
+        f"CUIT: 30-{i:08d}-1",
+        "Categoria: Textil e indumentaria",
+        "--- " + "descripción de la empresa " * random.randint(0, 8),
+    ]
+    return limpiar(" ".join(p for p in partes if p))
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(1)
+    textos = [detalle_sintetico(i) for i in range(filas)]
+
+    distintos = sum(1 for t in textos if parsear_detalle(t) != parsear_detalle_anterior(t))
+    print(f"Filas: {filas} | resultados distintos: {distintos}")
+
+    for nombre, funcion in [("anterior", parsear_detalle_anterior), ("una pasada", parsear_detalle)]:
+        t = min(timeit.repeat(lambda: [funcion(x) for x in textos], number=1, repeat=5))
+        print(f"{nombre:>12}: {t * 1000:8.1f} ms  ({t / filas * 1e6:.1f} µs/fila)")
+        if nombre == "anterior":
+            base = t
+    print(f"Speedup: {base / t:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Benchmark offline de los tres scrapers contra tráfico grabado.
+  python benchmarks/bench_scrapers.py grabar gba        # una corrida real que guarda los fixtures
+  python benchmarks/bench_scrapers.py [gba pyme maps] [-n 3] [--guardar-base] [--tolerancia 0.15]
+  python benchmarks/bench_scrapers.py gba --shards 3    # 3 procesos --shard i/3 y shards.py unir
+Cada scraper corre en una carpeta temporal contra servidor_replay.py (y los
+HAR para Playwright), sin red y sin las esperas de ritmo. Se informa tiempo
+total, leads/s, páginas/s, RSS pico y CPU del proceso, más el tiempo por
+etapa de metricas.py. Contra bases.json se marcan las regresiones (sale con 1).
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.join(AQUI, "..")
+sys.path.insert(0, AQUI)
+from servidor_replay import ServidorReplay
+
+ESCENARIOS = {
+    "gba":  {"script": "scraper_gba.py",             "salida": "leads_gba_productores.csv"},
+    "pyme": {"script": "scraper_plataformapyme.py",  "salida": "leads_plataformapyme.csv"},
+    "maps": {"script": "main.py",                    "salida": "leads_textil_argentina.csv"},
+}
+FIXTURES = os.path.join(AQUI, "fixtures")
+BASES = os.path.join(AQUI, "bases.json")
+
+# Métricas comparadas contra la base: True si más alto es peor
+METRICAS = {"segundos": True, "leads_s": False, "paginas_s": False, "rss_mb": True, "cpu_s": True}
+
+def ejecutar(escenario, entorno, shards=1):
+    """Corre el scraper en una carpeta temporal (con shards > 1, un proceso por
+    shard en paralelo y después la unión) → (segundos, [rusage], carpeta, código)"""
+    carpeta = tempfile.mkdtemp(prefix=f"bench_{escenario}_")
+    script = os.path.abspath(os.path.join(RAIZ, ESCENARIOS[escenario]["script"]))
+    entorno = {**os.environ, **entorno, "METRICAS_ARCHIVO": os.path.join(carpeta, "metricas.jsonl")}
+    comandos = [[sys.executable, script]] if shards == 1 else \
+        [[sys.executable, script, "--shard", f"{i}/{shards}"] for i in range(1, shards + 1)]
+    usos, codigo = [], 0
+    with open(os.path.join(carpeta, "salida.log"), "w") as log:
+        inicio = time.perf_counter()
+        procs = [subprocess.Popen(c, cwd=carpeta, env=entorno, stdout=log, stderr=subprocess.STDOUT) for c in comandos]
+        for proc in procs:
+            _, status, uso = os.wait4(proc.pid, 0)
+            usos.append(uso)
+            codigo = codigo or os.waitstatus_to_exitcode(status)
+        if shards > 1:
+            unir = [sys.executable, os.path.join(RAIZ, "shards.py"), "unir", escenario, "-n", str(shards), "--parcial"]
+            codigo = codigo or subprocess.run(unir, cwd=carpeta, stdout=log, stderr=subprocess.STDOUT).returncode
+        segundos = time.perf_counter() - inicio
+    return segundos, usos, carpeta, codigo
+
+def contar_leads(carpeta, salida):
+    for ruta in (os.path.join(carpeta, salida), os.path.join(carpeta, salida + ".parcial")):
+        if os.path.exists(ruta):
+            with open(ruta, newline="", encoding="utf-8-sig") as f:
+                return sum(1 for _ in csv.DictReader(f))
+    return 0
+
+def leer_metricas(ruta):
+    """Reporte JSON-lines de metricas.py sumado por etapa (todos los hosts) y por contador"""
+    etapas, contadores = {}, {}
+    if not os.path.exists(ruta):
+        return etapas, contadores
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            fila = json.loads(linea)
+            if fila["tipo"] == "etapa":
+                e = etapas.setdefault(fila["nombre"], {"segundos": 0.0, "veces": 0})
+                e["segundos"] += fila["segundos"]
+                e["veces"] += fila["veces"]
+            elif fila["tipo"] == "contador":
+                contadores[fila["nombre"]] = contadores.get(fila["nombre"], 0) + fila["valor"]
+    return etapas, contadores
+
+def grabar(escenario):
+    destino = os.path.join(FIXTURES, escenario)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(destino)
+    print(f"🔴 Grabando {escenario} contra los sitios reales → {destino}", flush=True)
+    segundos, _, carpeta, codigo = ejecutar(escenario, {"GRABAR_FIXTURES": destino})
+    respuestas = len([n for n in os.listdir(os.path.join(destino, "http")) if n.endswith(".json")]) \
+        if os.path.isdir(os.path.join(destino, "http")) else 0
+    hars = len(os.listdir(os.path.join(destino, "har"))) if os.path.isdir(os.path.join(destino, "har")) else 0
+    print(f"   {respuestas} respuestas HTTP y {hars} HAR en {segundos:.1f}s (código {codigo}, log en {carpeta})", flush=True)
+
+def medir(escenario, shards=1):
+    fixtures = os.path.join(FIXTURES, escenario)
+    servidor = ServidorReplay(fixtures)
+    entorno = {"REPLAY_SERVIDOR": servidor.iniciar(), "REPLAY_FIXTURES": fixtures, "RITMO_SIN_ESPERAS": "1"}
+    try:
+        segundos, usos, carpeta, codigo = ejecutar(escenario, entorno, shards)
+    finally:
+        servidor.detener()
+
+    etapas, contadores = leer_metricas(os.path.join(carpeta, "metricas.jsonl"))
+    leads = contar_leads(carpeta, ESCENARIOS[escenario]["salida"])
+    paginas = contadores.get("paginas", servidor.servidas)
+    resultado = {
+        "segundos": segundos,
+        "leads": leads,
+        "leads_s": leads / segundos,
+        "paginas": paginas,
+        "paginas_s": paginas / segundos,
+        "rss_mb": max(u.ru_maxrss for u in usos) / 1024,     # Linux: ru_maxrss en KB; el shard más pesado
+        "cpu_s": sum(u.ru_utime + u.ru_stime for u in usos),
+        "etapas": etapas,
+    }
+    if codigo:
+        print(f"   ⚠️  {escenario} terminó con código {codigo} (log en {carpeta})", flush=True)
+    else:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    if servidor.faltantes:
+        print(f"   ⚠️  {len(servidor.faltantes)} pedidos sin grabar, ej. {servidor.faltantes[0][:80]}", flush=True)
+    return resultado
+
+def mediana(corridas):
+    """Corrida representativa: la de tiempo total mediano"""
+    orden = sorted(corridas, key=lambda c: c["segundos"])
+    return orden[len(orden) // 2]
+
+def comparar(escenario, resultado, base, tolerancia):
+    regresiones = []
+    for metrica, mas_es_peor in METRICAS.items():
+        anterior, actual = base.get(metrica), resultado[metrica]
+        if not anterior:
+            continue
+        cambio = (actual - anterior) / anterior
+        if (cambio > tolerancia) if mas_es_peor else (cambio < -tolerancia):
+            regresiones.append(f"{metrica} {anterior:.2f} → {actual:.2f} ({cambio:+.0%})")
+    for r in regresiones:
+        print(f"   🔺 REGRESIÓN {escenario}: {r}", flush=True)
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers")
+    parser.add_argument("escenarios", nargs="*", help="grabar <escenario> | gba pyme maps (por defecto: los que tengan fixtures)")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3)
+    parser.add_argument("--guardar-base", action="store_true", help="guardar estos resultados como base")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    parser.add_argument("--shards", type=int, default=1, help="repartir cada corrida en N procesos (gba y maps)")
+    args = parser.parse_args()
+
+    if args.escenarios[:1] == ["grabar"]:
+        for escenario in args.escenarios[1:]:
+            grabar(escenario)
+        return
+
+    escenarios = args.escenarios or [e for e in ESCENARIOS if os.path.isdir(os.path.join(FIXTURES, e))]
+    if not escenarios:
+        print("❌ No hay fixtures: primero 'python benchmarks/bench_scrapers.py grabar gba'", flush=True)
+        sys.exit(2)
+    bases = {}
+    if os.path.exists(BASES):
+        with open(BASES, encoding="utf-8") as f:
+            bases = json.load(f)
+
+    regresiones = []
+    for escenario in escenarios:
+        shards = args.shards if escenario in ("gba", "maps") else 1
+        print(f"\n⏱️  {escenario}: {args.repeticiones} corridas en replay" + (f" con {shards} shards" if shards > 1 else ""), flush=True)
+        r = mediana([medir(escenario, shards) for _ in range(args.repeticiones)])
+        print(f"   {r['segundos']:.2f}s | {r['leads']} leads ({r['leads_s']:.1f}/s) | "
+              f"{r['paginas']} páginas ({r['paginas_s']:.1f}/s) | RSS {r['rss_mb']:.0f} MB | CPU {r['cpu_s']:.2f}s", flush=True)
+        for nombre, e in sorted(r["etapas"].items(), key=lambda x: -x[1]["segundos"]):
+            print(f"      {nombre:<20} {e['segundos']:8.2f}s acumulados en {e['veces']} veces", flush=True)
+        # Las corridas con shards tienen su propia base
+        nombre_base = escenario if shards == 1 else f"{escenario}-{shards}shards"
+        if nombre_base in bases:
+            regresiones += comparar(nombre_base, r, bases[nombre_base], args.tolerancia)
+        if args.guardar_base:
+            bases[nombre_base] = {m: round(r[m], 4) for m in METRICAS}
+
+    if args.guardar_base:
+        with open(BASES, "w", encoding="utf-8") as f:
+            json.dump(bases, f, indent=2)
+        print(f"\n💾 Base guardada en {BASES}", flush=True)
+    if regresiones:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
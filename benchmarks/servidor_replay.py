@@ -0,0 +1,77 @@
+"""
+Servidor local que reemplaza a los sitios reales con las respuestas grabadas
+(ver grabacion.py). Atiende /<esquema>/<host>/<path>?q con la respuesta
+grabada para <esquema>://<host>/<path>?q; lo que no se grabó devuelve 404.
+Uso suelto: python benchmarks/servidor_replay.py <carpeta fixtures> [puerto]
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from grabacion import leer_respuesta, url_original
+
+class ServidorReplay:
+    def __init__(self, fixtures, puerto=0):
+        self.fixtures = fixtures
+        self.servidas = 0
+        self.faltantes = []     # URLs pedidas que no estaban grabadas
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self.httpd.daemon_threads = True
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, como el sitio real
+
+            def _responder(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))  # Consumir el cuerpo (keep-alive)
+                url = url_original(self.path)
+                grabada = leer_respuesta(servidor.fixtures, self.command, url)
+                if grabada is None:
+                    with servidor.lock:
+                        servidor.faltantes.append(url)
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                meta, cuerpo = grabada
+                if meta["error"]:
+                    self.close_connection = True  # El sitio no respondió: se corta sin respuesta
+                    return
+                with servidor.lock:
+                    servidor.servidas += 1
+                self.send_response(meta["status"])
+                for k, v in meta["cabeceras"]:
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(cuerpo)
+
+            do_GET = do_HEAD = do_POST = _responder
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+    def iniciar(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == "__main__":
+    servidor = ServidorReplay(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8765)
+    print(f"🔁 Replay de {sys.argv[1]} en {servidor.iniciar()}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.detener()
@@ -0,0 +1,88 @@
+"""
+Cache persistente dominio → email (SQLite)
+Guarda también los resultados negativos (sitio sin email o caído) para no
+volver a gastar timeouts en cada corrida. Las entradas vencen por TTL y,
+si se pasa del máximo, se borran las menos usadas (LRU).
+"""
+
+import re
+import sqlite3
+import time
+
+DIA = 24 * 3600
+
+def normalizar_dominio(url):
+    """'https://WWW.Ejemplo.com.ar:443/contacto' → 'ejemplo.com.ar'"""
+    if not url: return ""
+    host = re.sub(r"^[a-zA-Z][a-zA-Z0-9+.\-]*://", "", url.strip()).split("/")[0]
+    host = host.split("@")[-1].split(":")[0].lower().rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+class CacheEmails:
+    def __init__(self, ruta, ttl_dias=30, ttl_negativo_dias=7, max_entradas=50000):
+        self.ttl = ttl_dias * DIA
+        self.ttl_negativo = ttl_negativo_dias * DIA
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._inserciones = 0
+        self.db = sqlite3.connect(ruta)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS emails (
+                dominio     TEXT PRIMARY KEY,
+                email       TEXT NOT NULL,
+                guardado    REAL NOT NULL,
+                ultimo_uso  REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS emails_ultimo_uso ON emails (ultimo_uso)")
+        self.db.commit()
+
+    def obtener(self, dominio):
+        """Devuelve (hay_dato, email). email == "" es un resultado negativo cacheado."""
+        fila = self.db.execute("SELECT email, guardado FROM emails WHERE dominio = ?", (dominio,)).fetchone()
+        ahora = time.time()
+        if fila:
+            email, guardado = fila
+            ttl = self.ttl if email else self.ttl_negativo
+            if ahora - guardado < ttl:
+                self.db.execute("UPDATE emails SET ultimo_uso = ? WHERE dominio = ?", (ahora, dominio))
+                self.db.commit()
+                self.hits += 1
+                return True, email
+            self.db.execute("DELETE FROM emails WHERE dominio = ?", (dominio,))
+            self.db.commit()
+        self.misses += 1
+        return False, ""
+
+    def guardar(self, dominio, email):
+        ahora = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO emails (dominio, email, guardado, ultimo_uso) VALUES (?, ?, ?, ?)",
+            (dominio, email or "", ahora, ahora),
+        )
+        self.db.commit()
+        self._inserciones += 1
+        if self._inserciones % 100 == 0:
+            self.desalojar()
+
+    def desalojar(self):
+        """Borra vencidos y, si sobra, las entradas usadas hace más tiempo"""
+        ahora = time.time()
+        self.db.execute(
+            "DELETE FROM emails WHERE (email != '' AND guardado < ?) OR (email = '' AND guardado < ?)",
+            (ahora - self.ttl, ahora - self.ttl_negativo),
+        )
+        total = self.db.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+        if total > self.max_entradas:
+            self.db.execute(
+                "DELETE FROM emails WHERE dominio IN (SELECT dominio FROM emails ORDER BY ultimo_uso LIMIT ?)",
+                (total - self.max_entradas,),
+            )
+        self.db.commit()
+
+    def cerrar(self):
+        self.desalojar()
+        self.db.close()
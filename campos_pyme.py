@@ -0,0 +1,39 @@
+"""
+Campos del texto de detalle del directorio PlataformaPYME.
+Compartido por scraper_plataformapyme.py y la variante Playwright en
+.github/workflows/. El texto se parte por todas las etiquetas en una sola
+pasada con un regex precompilado, en lugar de un re.search por campo.
+"""
+
+import re
+
+# Etiquetas que delimitan los campos dentro del detalle (en el orden del sitio)
+ETIQUETAS = ["Domicilio", "Localidad", "Provincia", "Teléfono", "Sitio Web",
+             "Email", "Condicion Fiscal", "CUIT", "Categoria"]
+FIN_DETALLE = "---"
+
+# Campo del CSV → etiqueta en el detalle
+CAMPOS_DETALLE = {
+    "domicilio": "Domicilio",
+    "provincia": "Provincia",
+    "telefono":  "Teléfono",
+    "sitio_web": "Sitio Web",
+    "email":     "Email",
+    "categoria": "Categoria",
+}
+
+_SEPARADOR = re.compile("(" + "|".join(re.escape(e) + ":" for e in ETIQUETAS) + "|" + re.escape(FIN_DETALLE) + ")")
+
+def limpiar(t):
+    return " ".join(t.split()).strip() if t else ""
+
+# Campo del CSV → separador tal como aparece en el texto ("Domicilio:")
+_CLAVES = {campo: etiqueta + ":" for campo, etiqueta in CAMPOS_DETALLE.items()}
+
+def parsear_detalle(texto):
+    """texto: detalle ya normalizado con limpiar (espacios simples)"""
+    # split con grupo → [antes, sep1, valor1, ..., sepN, valorN]. Armando el
+    # dict de atrás para adelante gana la primera aparición, como re.search.
+    partes = _SEPARADOR.split(texto)
+    valores = dict(zip(partes[-2:0:-2], partes[:0:-2]))
+    return {campo: valores.get(clave, "").strip() for campo, clave in _CLAVES.items()}
@@ -0,0 +1,265 @@
+"""
+Modo servicio del scraper de Maps: Chromium queda abierto con un pool de
+sesiones precalentadas (contexto + feed + pestañas) y las búsquedas llegan
+por una API HTTP chica, así un trabajo arranca sin pagar el inicio del navegador.
+
+    POST /busquedas        {"busquedas": ["fábrica textil Córdoba"], "max_resultados": 20} → {"id": 1}
+    GET  /busquedas/<id>   estado del trabajo y sus leads
+    GET  /salud            estado del pool
+    GET  /metrics          métricas en formato Prometheus
+
+Antes de prestar una sesión se chequea que responda, y se recicla cada
+RECICLAR_CADA_PAGINAS navegaciones o si su memoria JS pasa RECICLAR_HEAP_MB.
+Si Chromium se cae el proceso termina con error para que Railway lo reinicie.
+Uso: python3 daemon_maps.py [--puerto 8080]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+from playwright.async_api import async_playwright
+import metricas
+from metricas import contar_error
+from cache_emails import CacheEmails
+from estado_crawl import EstadoMemoria
+from leads_db import LeadStore
+from prefiltro_web import PrefiltroWeb
+from main import (
+    CACHE_EMAILS, CACHE_TTL_DIAS, CACHE_TTL_NEGATIVO_DIAS, CACHE_MAX_DOMINIOS,
+    CONTEXTOS_MAPS, MAX_POR_BUSQUEDA, PERFILES_CONTEXTO, WORKERS_EMAIL,
+    PaginaReciclable, Salida, SesionMaps, crear_cliente_http, guardar_stats_rutas,
+    lanzar_navegador, procesar_busqueda, stats_rutas, worker_emails,
+)
+
+PUERTO = int(os.environ.get("PORT", 8080))
+MAX_RESULTADOS_TRABAJO = 100    # tope de max_resultados por búsqueda
+MAX_TRABAJOS = 200              # trabajos terminados que se recuerdan para consultar
+
+RAZONES = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}
+
+class Trabajo:
+    """Una lista de búsquedas pedida por la API. Hace de escritor para Salida."""
+    def __init__(self, id, busquedas, maximo, store):
+        self.id = id
+        self.busquedas = busquedas
+        self.maximo = maximo
+        self.estado = "en_cola"
+        self.pendientes = len(busquedas)
+        self.leads = []
+        self.vistos = set()
+        self.escritos = 0
+        self.creado = time.time()
+        self.terminado = None
+        # Sin archivo de estado: la dedup de lugares vive solo en memoria
+        self.salida = Salida(self, EstadoMemoria(), store)
+
+    def escribir(self, lead):
+        self.escritos += 1
+
+    def resumen(self):
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "busquedas": self.busquedas,
+            "max_resultados": self.maximo,
+            "leads_escritos": self.escritos,
+            "segundos": round((self.terminado or time.time()) - self.creado, 1),
+            "leads": self.leads,
+        }
+
+class Servicio:
+    def __init__(self, p):
+        self.p = p
+        self.trabajos = {}
+        self.siguiente_id = 1
+        self.cola_busquedas = asyncio.Queue()   # (trabajo, búsqueda)
+        self.caido = asyncio.Event()
+
+    async def iniciar(self):
+        inicio = time.monotonic()
+        self.browser = await lanzar_navegador(self.p)
+        self.sesiones = asyncio.Queue()
+        for i in range(CONTEXTOS_MAPS):
+            self.sesiones.put_nowait(await SesionMaps(self.browser, PERFILES_CONTEXTO[i % len(PERFILES_CONTEXTO)]).abrir())
+
+        self.cliente = crear_cliente_http()
+        self.cache = CacheEmails(CACHE_EMAILS, CACHE_TTL_DIAS, CACHE_TTL_NEGATIVO_DIAS, CACHE_MAX_DOMINIOS)
+        self.store = LeadStore()
+        self.prefiltro = PrefiltroWeb()
+        self.cola_emails = asyncio.Queue()
+        semaforos = {}
+        self.web_pages = [PaginaReciclable(self.browser) for _ in range(WORKERS_EMAIL)]
+        self.tareas = [asyncio.create_task(worker_emails(pagina, self.cliente, self.cache, self.cola_emails, semaforos,
+                                                     self.prefiltro))
+                       for pagina in self.web_pages]
+        self.tareas += [asyncio.create_task(self.worker_busquedas()) for _ in range(CONTEXTOS_MAPS)]
+        print(f"🔥 Pool listo: {CONTEXTOS_MAPS} sesiones de Maps en {time.monotonic() - inicio:.1f}s", flush=True)
+
+    def encolar(self, busquedas, maximo):
+        trabajo = Trabajo(self.siguiente_id, busquedas, maximo, self.store)
+        self.siguiente_id += 1
+        self.trabajos[trabajo.id] = trabajo
+        for busqueda in busquedas:
+            self.cola_busquedas.put_nowait((trabajo, busqueda))
+        # Olvidar los trabajos terminados más viejos
+        terminados = [t for t in self.trabajos.values() if t.terminado]
+        for viejo in sorted(terminados, key=lambda t: t.terminado)[:max(0, len(terminados) - MAX_TRABAJOS)]:
+            del self.trabajos[viejo.id]
+        print(f"📥 Trabajo #{trabajo.id}: {len(busquedas)} búsquedas (máx. {maximo} resultados)", flush=True)
+        return trabajo
+
+    async def prestar_sesion(self):
+        """Una sesión libre que pasó el chequeo de salud (si no, se recicla).
+        Si falla, la sesión vuelve al pool y se rechequea en el próximo préstamo."""
+        sesion = await self.sesiones.get()
+        try:
+            if not self.browser.is_connected():
+                self.caido.set()
+                raise RuntimeError("Chromium se desconectó")
+            if not await sesion.sana():
+                await sesion.reciclar()
+        except BaseException:
+            self.sesiones.put_nowait(sesion)
+            raise
+        return sesion
+
+    async def worker_busquedas(self):
+        while True:
+            trabajo, busqueda = await self.cola_busquedas.get()
+            trabajo.estado = "corriendo"
+            sesion = None
+            try:
+                sesion = await self.prestar_sesion()
+                sesion.paginas += await procesar_busqueda(sesion.maps_page, sesion.pestanas, busqueda, trabajo.vistos,
+                                                          trabajo.leads, self.cola_emails, trabajo.salida, trabajo.maximo)
+            except Exception as e:
+                contar_error("busqueda", e)
+                print(f"   ❌ Error en '{busqueda}': {e}", flush=True)
+            finally:
+                if sesion:
+                    self.sesiones.put_nowait(sesion)
+                # La búsqueda cuenta como terminada aunque haya fallado
+                trabajo.pendientes -= 1
+                if trabajo.pendientes == 0:
+                    asyncio.create_task(self.terminar(trabajo))
+
+    async def terminar(self, trabajo):
+        # Maps terminó; falta que los workers de email escriban los leads encolados
+        try:
+            while any(trabajo.salida.esperando_email.values()):
+                await asyncio.sleep(0.2)
+            self.store.commit()
+        except Exception as e:
+            contar_error("terminar_trabajo", e)
+            print(f"   ⚠️  Trabajo #{trabajo.id}: error al cerrar ({e})", flush=True)
+        finally:
+            trabajo.estado = "terminado"
+            trabajo.terminado = time.time()
+        print(f"✅ Trabajo #{trabajo.id}: {len(trabajo.leads)} leads en {trabajo.terminado - trabajo.creado:.1f}s", flush=True)
+
+    def salud(self):
+        return {
+            "navegador_conectado": self.browser.is_connected(),
+            "sesiones": CONTEXTOS_MAPS,
+            "sesiones_libres": self.sesiones.qsize(),
+            "busquedas_en_cola": self.cola_busquedas.qsize(),
+            "emails_en_cola": self.cola_emails.qsize(),
+            "trabajos": len(self.trabajos),
+        }
+
+    def rutear(self, metodo, ruta, cuerpo):
+        """(status, datos) de un pedido a la API; datos str se manda como texto"""
+        if metodo == "POST" and ruta == "/busquedas":
+            pedido = json.loads(cuerpo or b"{}")
+            busquedas = [b.strip() for b in pedido.get("busquedas", []) if isinstance(b, str) and b.strip()]
+            if not busquedas:
+                return 400, {"error": "faltan busquedas"}
+            maximo = min(int(pedido.get("max_resultados") or MAX_POR_BUSQUEDA), MAX_RESULTADOS_TRABAJO)
+            return 202, {"id": self.encolar(busquedas, maximo).id}
+        if metodo == "GET" and ruta.startswith("/busquedas/"):
+            trabajo = self.trabajos.get(int(ruta.rsplit("/", 1)[1]) if ruta.rsplit("/", 1)[1].isdigit() else -1)
+            return (200, trabajo.resumen()) if trabajo else (404, {"error": "trabajo inexistente"})
+        if metodo == "GET" and ruta == "/salud":
+            return 200, self.salud()
+        if metodo == "GET" and ruta == "/metrics":
+            return 200, metricas.prometheus()
+        return 404, {"error": "ruta inexistente"}
+
+    async def atender(self, reader, writer):
+        try:
+            metodo, ruta, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            cabeceras = {}
+            while True:
+                linea = (await reader.readline()).decode("latin-1").strip()
+                if not linea:
+                    break
+                k, _, v = linea.partition(":")
+                cabeceras[k.strip().lower()] = v.strip()
+            cuerpo = await reader.readexactly(int(cabeceras.get("content-length") or 0))
+            status, datos = self.rutear(metodo.upper(), ruta.split("?")[0], cuerpo)
+        except Exception as e:
+            status, datos = 400, {"error": str(e)}
+        if isinstance(datos, str):
+            tipo, cuerpo = "text/plain; version=0.0.4", datos.encode()
+        else:
+            tipo, cuerpo = "application/json; charset=utf-8", json.dumps(datos, ensure_ascii=False).encode()
+        writer.write(f"HTTP/1.1 {status} {RAZONES[status]}\r\nContent-Type: {tipo}\r\n"
+                     f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode() + cuerpo)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def cerrar(self):
+        for tarea in self.tareas:
+            tarea.cancel()
+        await asyncio.gather(*self.tareas, return_exceptions=True)
+        for pagina in self.web_pages:
+            await pagina.cerrar()
+        if self.browser.is_connected():
+            await self.browser.close()
+        await self.cliente.aclose()
+        await self.prefiltro.cerrar()
+        self.cache.cerrar()
+        self.store.cerrar()
+        guardar_stats_rutas(stats_rutas)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Scraper de Maps como servicio con navegadores precalentados")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args()
+
+    print("=" * 55, flush=True)
+    print("🧵 SCRAPER TEXTIL ARGENTINA — modo servicio", flush=True)
+    print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+    print("=" * 55, flush=True)
+
+    async with async_playwright() as p:
+        servicio = Servicio(p)
+        await servicio.iniciar()
+        servidor = await asyncio.start_server(servicio.atender, "0.0.0.0", args.puerto)
+        print(f"🌐 API en http://0.0.0.0:{args.puerto}", flush=True)
+
+        detener = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            asyncio.get_running_loop().add_signal_handler(sig, detener.set)
+        esperas = [asyncio.create_task(detener.wait()), asyncio.create_task(servicio.caido.wait())]
+        await asyncio.wait(esperas, return_when=asyncio.FIRST_COMPLETED)
+        for espera in esperas:
+            espera.cancel()
+
+        servidor.close()
+        await servidor.wait_closed()
+        await servicio.cerrar()
+    print(f"📈 Etapas: {metricas.resumen()}", flush=True)
+    if servicio.caido.is_set():
+        print("❌ Chromium se cayó: saliendo para que el proceso se reinicie", flush=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Modo delta: solo se vuelve a parsear lo que cambió desde la última corrida.
+Por cada URL se guardan ETag, Last-Modified, un hash del contenido y lo
+que se extrajo de ella (SQLite). Los pedidos salen condicionales
+(If-None-Match / If-Modified-Since); si el servidor responde 304 o el hash
+coincide, se reutiliza lo extraído sin parsear. Al final se escribe un CSV
+con los leads nuevos, cambiados y eliminados respecto de la corrida anterior.
+"""
+
+import csv
+import hashlib
+import json
+import sqlite3
+import time
+
+def huella(contenido):
+    return hashlib.sha256(contenido or b"").hexdigest()
+
+class CacheDelta:
+    def __init__(self, ruta):
+        self.db = sqlite3.connect(ruta)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                url           TEXT PRIMARY KEY,
+                grupo         TEXT NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                hash          TEXT NOT NULL,
+                datos         TEXT NOT NULL,
+                guardado      REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+        # Foto de la corrida anterior, en memoria: los hilos de descarga solo la leen
+        self.previas = {
+            url: {"grupo": grupo, "etag": etag, "last_modified": lm, "hash": h, "datos": json.loads(datos)}
+            for url, grupo, etag, lm, h, datos in self.db.execute(
+                "SELECT url, grupo, etag, last_modified, hash, datos FROM paginas")
+        }
+        self.vistas = {}            # url → datos de esta corrida
+        self.incompletos = set()    # grupos con páginas que no se pudieron verificar
+        self.sin_cambio = 0
+        self.cambiadas = 0
+
+    def cabeceras(self, url):
+        """Cabeceras para un pedido condicional sobre lo guardado de la URL"""
+        previa = self.previas.get(url)
+        if not previa:
+            return {}
+        cabeceras = {}
+        if previa["etag"]:
+            cabeceras["If-None-Match"] = previa["etag"]
+        if previa["last_modified"]:
+            cabeceras["If-Modified-Since"] = previa["last_modified"]
+        return cabeceras
+
+    def sin_cambios(self, url, r):
+        """True si la respuesta (requests/httpx) es la misma página que la última vez"""
+        previa = self.previas.get(url)
+        if not previa:
+            return False
+        return r.status_code == 304 or (r.status_code == 200 and huella(r.content) == previa["hash"])
+
+    def reutilizar(self, url):
+        """Datos extraídos la última vez, sin volver a parsear la página"""
+        self.sin_cambio += 1
+        datos = self.previas[url]["datos"]
+        self.vistas[url] = datos
+        return datos
+
+    def guardar(self, url, grupo, r, datos):
+        self.cambiadas += 1
+        self.vistas[url] = datos
+        self.db.execute(
+            "INSERT OR REPLACE INTO paginas (url, grupo, etag, last_modified, hash, datos, guardado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, str(grupo), r.headers.get("ETag"), r.headers.get("Last-Modified"), huella(r.content),
+             json.dumps(datos, ensure_ascii=False), time.time()),
+        )
+        self.db.commit()
+
+    def incompleto(self, grupo):
+        """El grupo no se recorrió entero: sus leads faltantes no cuentan como eliminados"""
+        self.incompletos.add(str(grupo))
+
+    def diferencias(self, clave):
+        """Filas {"cambio": nuevo|cambiado|eliminado, **lead} respecto de la corrida anterior"""
+        antes = {}
+        eliminables = set()
+        for url, previa in self.previas.items():
+            for lead in previa["datos"].get("leads", []):
+                antes[clave(lead)] = lead
+                if previa["grupo"] not in self.incompletos:
+                    eliminables.add(clave(lead))
+        ahora = {clave(lead): lead for datos in self.vistas.values() for lead in datos.get("leads", [])}
+
+        filas = []
+        for k, lead in ahora.items():
+            if k not in antes:
+                filas.append({"cambio": "nuevo", **lead})
+            elif antes[k] != lead:
+                filas.append({"cambio": "cambiado", **lead})
+        filas += [{"cambio": "eliminado", **lead} for k, lead in antes.items() if k in eliminables and k not in ahora]
+        return filas
+
+    def escribir_diff(self, ruta, campos, clave):
+        filas = self.diferencias(clave)
+        with open(ruta, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.DictWriter(f, fieldnames=["cambio"] + campos, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(filas)
+        return filas
+
+    def resumen(self):
+        return f"{self.sin_cambio} páginas sin cambios (sin parsear), {self.cambiadas} nuevas o cambiadas"
+
+    def cerrar(self):
+        # URLs que desaparecieron de grupos recorridos enteros (ej. un rubro con menos páginas)
+        for url, previa in self.previas.items():
+            if url not in self.vistas and previa["grupo"] not in self.incompletos:
+                self.db.execute("DELETE FROM paginas WHERE url = ?", (url,))
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,57 @@
+"""
+Estado persistente de un crawl para poder reanudarlo con --resume.
+Cada unidad de trabajo terminada (rubro+página, búsqueda+lugar, ...) se
+agrega como una línea a un archivo de texto. Si el proceso muere, la
+siguiente corrida con --resume saltea lo que ya está registrado; al
+terminar bien el archivo se borra.
+"""
+
+import os
+
+class EstadoCrawl:
+    def __init__(self, ruta, reanudar=False):
+        self.ruta = ruta
+        self.hechas = set()
+        if reanudar and os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                self.hechas = {linea.rstrip("\n") for linea in f if linea.strip()}
+        self.f = open(ruta, "a" if reanudar else "w", encoding="utf-8")
+
+    def hecho(self, unidad):
+        return unidad in self.hechas
+
+    def marcar(self, unidad):
+        if unidad in self.hechas:
+            return
+        self.hechas.add(unidad)
+        self.f.write(unidad.replace("\n", " ") + "\n")
+        self.f.flush()
+
+    def cerrar(self):
+        if not self.f.closed:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.f.close()
+
+    def terminar(self):
+        """Crawl completo: ya no hay nada que reanudar"""
+        self.cerrar()
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+class EstadoMemoria:
+    """Mismo uso que EstadoCrawl pero sin archivo, para corridas que no se reanudan"""
+    def __init__(self):
+        self.hechas = set()
+
+    def hecho(self, unidad):
+        return unidad in self.hechas
+
+    def marcar(self, unidad):
+        self.hechas.add(unidad)
+
+    def cerrar(self):
+        pass
+
+    def terminar(self):
+        pass
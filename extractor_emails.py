@@ -0,0 +1,90 @@
+"""
+Extracción de emails de páginas de empresas.
+- Descarta enseguida las páginas sin '@' (ni sus variantes ofuscadas).
+- Busca solo en el texto visible, los href mailto: y los datos JSON-LD;
+  el resto de <script>/<style> (JS y CSS inline) no se escanea.
+- Decodifica entidades HTML y ofuscaciones comunes ([at], (arroba), ...).
+- Aplica la lista de descarte con un único regex precompilado.
+- Ordena los candidatos: primero los del dominio del propio sitio.
+"""
+
+import html
+import re
+
+# Emails genéricos/spam que no sirven como lead
+EMAILS_DESCARTAR = ["noreply", "no-reply", "example", "test", "spam", "sentry", "wix", "wordpress"]
+
+# Falsos positivos típicos: nombres de archivo tipo logo@2x.png
+EXTENSIONES_DESCARTAR = ["png", "jpg", "jpeg", "gif", "svg", "webp", "css", "js"]
+
+# Prefijos de casillas comerciales, preferidas frente a las personales
+PREFIJOS_PREFERIDOS = ["ventas", "info", "contacto", "comercial", "administracion", "hola"]
+
+# Todo se aplica sobre el HTML en minúsculas: sin (?i) los regex pueden
+# saltar directo al literal inicial y el resultado sale ya normalizado.
+_RE_EMAIL = re.compile(r"[a-z0-9._%+\-]+@[a-z0-9.\-]+\.[a-z]{2,}")
+_RE_DESCARTAR = re.compile("|".join(re.escape(x) for x in EMAILS_DESCARTAR))
+_RE_EXTENSION = re.compile(r"\.(?:" + "|".join(EXTENSIONES_DESCARTAR) + r")$")
+
+_RE_SIN_TEXTO = [re.compile(r"(?s)<!--.*?-->")] + [
+    re.compile(rf"(?s)<{tag}\b.*?</{tag}\s*>") for tag in ("script", "style", "noscript", "svg", "template")
+]
+_RE_JSON_LD = re.compile(r"(?s)<script[^>]+application/ld\+json[^>]*>(.*?)</script\s*>")
+_RE_MAILTO = re.compile(r"""mailto:([^"'?>\s]+)""")
+_RE_TAG = re.compile(r"<[^>]+>")
+
+# "ventas [at] empresa [dot] com", "ventas(arroba)empresa.com", ...
+_RE_ARROBA = re.compile(r"\s*[\[\(\{<]\s*(?:at|arroba)\s*[\]\)\}>]\s*|\s+arroba\s+")
+_RE_PUNTO = re.compile(r"\s*[\[\(\{<]\s*(?:dot|punto)\s*[\]\)\}>]\s*")
+_MARCAS = ("@", "&#64;", "&#x40;", "&commat;", "%40", "at]", "at)", "arroba")
+
+def _tiene_marca(bajo):
+    return any(m in bajo for m in _MARCAS)
+
+def _desofuscar(texto):
+    texto = _RE_ARROBA.sub("@", texto)
+    return _RE_PUNTO.sub(".", texto)
+
+def es_valido(email):
+    return not _RE_DESCARTAR.search(email) and not _RE_EXTENSION.search(email)
+
+def _puntaje(email, dominio):
+    local, _, host = email.partition("@")
+    puntos = 0
+    if dominio and (host == dominio or host.endswith("." + dominio)):
+        puntos += 4
+    if local.split(".")[0] in PREFIJOS_PREFERIDOS:
+        puntos += 1
+    if len(local) > 30 or re.fullmatch(r"[0-9a-f]{16,}", local):
+        puntos -= 5  # hashes y cadenas de tracking
+    return puntos
+
+def extraer_emails(contenido, dominio=""):
+    """Emails válidos (en minúsculas) de la página, del más al menos probable como contacto"""
+    if not contenido:
+        return []
+    bajo = contenido.lower()
+    if not _tiene_marca(bajo):
+        return []
+
+    fuentes = _RE_MAILTO.findall(bajo) if "mailto:" in bajo else []
+    if "ld+json" in bajo:
+        fuentes += _RE_JSON_LD.findall(bajo)
+    texto = bajo
+    for regex in _RE_SIN_TEXTO:
+        texto = regex.sub(" ", texto)
+    fuentes.append(_RE_TAG.sub(" ", texto))
+
+    encontrados = []
+    for fuente in fuentes:
+        fuente = _desofuscar(html.unescape(fuente.replace("%40", "@")))
+        if "@" not in fuente:
+            continue
+        for email in _RE_EMAIL.findall(fuente):
+            email = email.strip(".")
+            if email not in encontrados and es_valido(email):
+                encontrados.append(email)
+
+    # sorted es estable: a igual puntaje se respeta el orden de aparición
+    dominio = (dominio or "").lower()
+    return sorted(encontrados, key=lambda e: -_puntaje(e, dominio))
@@ -0,0 +1,133 @@
+"""
+Grabación y replay del tráfico de los scrapers, para medirlos sin salir a internet.
+- GRABAR_FIXTURES=<carpeta>: las respuestas de requests/httpx se guardan en
+  <carpeta>/http y el tráfico de Playwright en <carpeta>/har/*.har.
+- REPLAY_SERVIDOR=http://127.0.0.1:<puerto> y REPLAY_FIXTURES=<carpeta>: los
+  pedidos de requests/httpx van al servidor de replay
+  (benchmarks/servidor_replay.py) como /<esquema>/<host>/<path> y Playwright
+  responde desde los HAR grabados; lo que no se grabó falla, sin tocar la red.
+Sin estas variables los scrapers usan los adaptadores normales.
+"""
+
+import glob
+import hashlib
+import itertools
+import json
+import os
+from urllib.parse import urlsplit
+
+GRABAR = os.environ.get("GRABAR_FIXTURES", "")
+REPLAY = os.environ.get("REPLAY_SERVIDOR", "").rstrip("/")
+FIXTURES_REPLAY = os.environ.get("REPLAY_FIXTURES", "")
+
+# Se guarda el cuerpo ya decodificado: estas cabeceras dejarían de ser ciertas
+CABECERAS_DESCARTAR = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+_hars = itertools.count()
+
+def clave(metodo, url):
+    return hashlib.sha1(f"{metodo.upper()} {url}".encode()).hexdigest()
+
+def guardar_respuesta(metodo, url, status, cabeceras, cuerpo, error=False):
+    carpeta = os.path.join(GRABAR, "http")
+    os.makedirs(carpeta, exist_ok=True)
+    base = os.path.join(carpeta, clave(metodo, url))
+    meta = {
+        "metodo": metodo.upper(),
+        "url": url,
+        "status": status,
+        "cabeceras": [[k, v] for k, v in cabeceras if k.lower() not in CABECERAS_DESCARTAR],
+        "error": error,
+    }
+    with open(base + ".body", "wb") as f:
+        f.write(cuerpo or b"")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+def leer_respuesta(carpeta, metodo, url):
+    """(meta, cuerpo) grabados para el pedido, o None"""
+    base = os.path.join(carpeta, "http", clave(metodo, url))
+    if not os.path.exists(base + ".json"):
+        return None
+    with open(base + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(base + ".body", "rb") as f:
+        return meta, f.read()
+
+def url_replay(url):
+    """'https://host/path?q' → '<REPLAY_SERVIDOR>/https/host/path?q'"""
+    partes = urlsplit(url)
+    consulta = f"?{partes.query}" if partes.query else ""
+    return f"{REPLAY}/{partes.scheme}/{partes.netloc}{partes.path or '/'}{consulta}"
+
+def url_original(path):
+    """'/https/host/path?q' → 'https://host/path?q' (inversa de url_replay)"""
+    esquema, _, resto = path.lstrip("/").partition("/")
+    return f"{esquema}://{resto}"
+
+def adaptador_requests(**kwargs):
+    """HTTPAdapter para montar en una requests.Session, que graba o redirige al replay"""
+    from requests.adapters import HTTPAdapter
+    if not (GRABAR or REPLAY):
+        return HTTPAdapter(**kwargs)
+
+    class AdaptadorGrabacion(HTTPAdapter):
+        def send(self, request, **kw):
+            if REPLAY:
+                original = request.url
+                request.url = url_replay(original)
+                try:
+                    r = super().send(request, **kw)
+                finally:
+                    request.url = original
+                r.url = original  # Los redirects relativos se resuelven contra la URL real
+                return r
+            try:
+                r = super().send(request, **kw)
+            except Exception:
+                guardar_respuesta(request.method, request.url, 0, [], b"", error=True)
+                raise
+            guardar_respuesta(request.method, request.url, r.status_code, r.headers.items(), r.content)
+            return r
+
+    return AdaptadorGrabacion(**kwargs)
+
+def transporte_httpx(**kwargs):
+    """AsyncHTTPTransport para httpx.AsyncClient, que graba o redirige al replay"""
+    import httpx
+    if not (GRABAR or REPLAY):
+        return httpx.AsyncHTTPTransport(**kwargs)
+
+    class TransporteGrabacion(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            if REPLAY:
+                original = request.url
+                request.url = httpx.URL(url_replay(str(original)))
+                try:
+                    return await super().handle_async_request(request)
+                finally:
+                    request.url = original
+            try:
+                respuesta = await super().handle_async_request(request)
+            except httpx.TransportError:
+                guardar_respuesta(request.method, str(request.url), 0, [], b"", error=True)
+                raise
+            cuerpo = await respuesta.aread()
+            guardar_respuesta(request.method, str(request.url), respuesta.status_code,
+                              respuesta.headers.multi_items(), cuerpo)
+            return respuesta
+
+    return TransporteGrabacion(**kwargs)
+
+async def preparar_contexto(contexto, nombre):
+    """Graba el contexto de Playwright a un HAR o lo responde desde los HAR grabados.
+    Llamar antes de aplicar_perfil, así el bloqueo de recursos sigue teniendo prioridad."""
+    if GRABAR:
+        carpeta = os.path.join(GRABAR, "har")
+        os.makedirs(carpeta, exist_ok=True)
+        ruta = os.path.join(carpeta, f"{nombre}_{next(_hars)}.har")
+        await contexto.route_from_har(ruta, update=True, update_content="embed")
+    elif REPLAY:
+        await contexto.route("**/*", lambda route: route.abort())  # sin red: lo no grabado falla
+        for har in sorted(glob.glob(os.path.join(FIXTURES_REPLAY, "har", "*.har"))):
+            await contexto.route_from_har(har, not_found="fallback")
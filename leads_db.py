@@ -0,0 +1,257 @@
+"""
+Base unificada de leads (SQLite) con dedup entre fuentes.
+Cada scraper hace upsert de sus leads a medida que los encuentra. Una
+empresa se reconoce por CUIT, email, teléfono, dominio propio o nombre
+normalizado (en ese orden) y sus datos se van completando con cada fuente.
+Los CSV se generan con un export:
+
+    python leads_db.py exportar [salida.csv]            # base unificada
+    python leads_db.py exportar --fuente gba [salida.csv]
+    python leads_db.py importar leads_gba_productores.csv gba
+"""
+
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+
+RUTA_DB = "leads.sqlite"
+
+CAMPOS = ["nombre", "cuit", "email", "telefono", "sitio_web", "direccion", "localidad",
+          "provincia", "rubro", "producto", "categoria", "fuentes", "primera_vez", "ultima_vez"]
+
+# Dominios de email que no identifican a una empresa
+DOMINIOS_GENERICOS = {"gmail.com", "hotmail.com", "hotmail.com.ar", "yahoo.com", "yahoo.com.ar",
+                      "outlook.com", "live.com", "live.com.ar", "icloud.com", "fibertel.com.ar",
+                      "speedy.com.ar", "arnet.com.ar"}
+
+# Sitios web que no son de la empresa (redes, linktree, marketplaces, hosting gratuito)
+HOSTS_NO_EMPRESA = {"facebook.com", "fb.com", "instagram.com", "linktr.ee", "wa.me", "whatsapp.com",
+                    "sites.google.com", "google.com", "business.site", "g.page",
+                    "mercadolibre.com.ar", "mercadolibre.com", "mercadoshops.com.ar", "tiendanube.com",
+                    "empretienda.com.ar", "wixsite.com", "blogspot.com", "wordpress.com", "linkedin.com",
+                    "twitter.com", "x.com", "youtube.com", "tiktok.com", "bit.ly", "beacons.ai"}
+
+SUFIJOS_SOCIETARIOS = re.compile(r"\b(s\s?a\s?i?\s?c?\s?i?\s?f?|s\s?r\s?l|s\s?a\s?s|s\s?h|s\s?c\s?a|y\s?cia|e\s?hijos)\b\.?$")
+
+def _sin_acentos(t):
+    return "".join(c for c in unicodedata.normalize("NFKD", t) if not unicodedata.combining(c))
+
+def normalizar_nombre(nombre):
+    t = _sin_acentos(nombre or "").lower().replace(".", "")
+    t = re.sub(r"[^a-z0-9]+", " ", t).strip()
+    return SUFIJOS_SOCIETARIOS.sub("", t).strip()
+
+def normalizar_cuit(cuit):
+    digitos = re.sub(r"\D", "", cuit or "")
+    return digitos if len(digitos) == 11 else ""
+
+def normalizar_telefono(telefono):
+    """Últimos 10 dígitos del primer número (sin +54, 0 ni 15 adelante)"""
+    primero = re.split(r"[/,;]| - | y ", telefono or "")[0]
+    digitos = re.sub(r"\D", "", primero)
+    if digitos.startswith("54"):
+        digitos = digitos[2:]
+    digitos = digitos.lstrip("0")
+    return digitos[-10:] if len(digitos) >= 8 else ""
+
+def normalizar_dominio_web(url):
+    host = re.sub(r"^[a-z]+://", "", (url or "").strip().lower()).split("/")[0].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+def es_host_no_empresa(dominio):
+    return any(dominio == h or dominio.endswith("." + h) for h in HOSTS_NO_EMPRESA)
+
+def dominio_email(email):
+    return (email or "").strip().lower().rpartition("@")[2]
+
+def lead_unificado(lead):
+    """Lleva un lead de cualquier scraper a los campos de la base"""
+    return {
+        "nombre":    lead.get("nombre") or lead.get("razon_social") or "",
+        "cuit":      lead.get("cuit", ""),
+        "email":     (lead.get("email") or "").strip().lower(),
+        "telefono":  lead.get("telefono", ""),
+        "sitio_web": lead.get("sitio_web", ""),
+        "direccion": lead.get("direccion") or lead.get("domicilio") or "",
+        "localidad": lead.get("localidad") or lead.get("lugar") or "",
+        "provincia": lead.get("provincia", ""),
+        "rubro":     lead.get("rubro") or lead.get("busqueda_origen") or "",
+        "producto":  lead.get("producto", ""),
+        "categoria": lead.get("categoria", ""),
+    }
+
+class LeadStore:
+    def __init__(self, ruta=RUTA_DB, commit_cada=200):
+        self.commit_cada = commit_cada
+        self._pendientes = 0
+        self.insertados = 0
+        self.actualizados = 0
+        self.db = sqlite3.connect(ruta)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id            INTEGER PRIMARY KEY,
+                nombre        TEXT, nombre_norm   TEXT,
+                cuit          TEXT, cuit_norm     TEXT,
+                email         TEXT, email_dominio TEXT,
+                telefono      TEXT, telefono_norm TEXT,
+                sitio_web     TEXT, dominio_web   TEXT,
+                direccion     TEXT, localidad     TEXT, provincia TEXT,
+                rubro         TEXT, producto      TEXT, categoria TEXT,
+                fuentes       TEXT,
+                primera_vez   TEXT, ultima_vez    TEXT
+            );
+            CREATE INDEX IF NOT EXISTS leads_cuit     ON leads (cuit_norm);
+            CREATE INDEX IF NOT EXISTS leads_email    ON leads (email);
+            CREATE INDEX IF NOT EXISTS leads_email_dom ON leads (email_dominio);
+            CREATE INDEX IF NOT EXISTS leads_telefono ON leads (telefono_norm);
+            CREATE INDEX IF NOT EXISTS leads_web      ON leads (dominio_web);
+            CREATE INDEX IF NOT EXISTS leads_nombre   ON leads (nombre_norm);
+
+            -- Fila original de cada fuente, para poder exportar con su esquema
+            CREATE TABLE IF NOT EXISTS origenes (
+                fuente      TEXT NOT NULL,
+                clave       TEXT NOT NULL,
+                lead_id     INTEGER NOT NULL REFERENCES leads (id),
+                datos       TEXT NOT NULL,
+                actualizado TEXT NOT NULL,
+                PRIMARY KEY (fuente, clave)
+            );
+        """)
+
+    def _buscar(self, u, claves):
+        """Id de la empresa ya cargada que coincide por alguna clave fuerte, o None.
+        Nunca junta dos empresas con CUIT distinto."""
+        consultas = [
+            ("cuit_norm", claves["cuit_norm"]),
+            ("email", u["email"]),
+            ("telefono_norm", claves["telefono_norm"]),
+        ]
+        web = claves["dominio_web"]
+        if web and web not in DOMINIOS_GENERICOS and not es_host_no_empresa(web):
+            # El dominio del email solo identifica si es el del propio sitio:
+            # cualquier proveedor de correo que falte en la lista juntaría empresas
+            if claves["email_dominio"] == web:
+                consultas.append(("email_dominio", web))
+            consultas.append(("dominio_web", web))
+        consultas.append(("nombre_norm", claves["nombre_norm"]))
+        cuit = claves["cuit_norm"]
+        sin_conflicto = " AND (cuit_norm IS NULL OR cuit_norm = '' OR cuit_norm = ?)" if cuit else ""
+        for columna, valor in consultas:
+            if not valor:
+                continue
+            parametros = (valor, cuit) if cuit else (valor,)
+            fila = self.db.execute(f"SELECT id FROM leads WHERE {columna} = ?{sin_conflicto} LIMIT 1", parametros).fetchone()
+            if fila:
+                return fila["id"]
+        return None
+
+    def upsert(self, fuente, lead, clave=None):
+        """Inserta o completa la empresa y guarda la fila original de la fuente"""
+        u = lead_unificado(lead)
+        claves = {
+            "nombre_norm":   normalizar_nombre(u["nombre"]),
+            "cuit_norm":     normalizar_cuit(u["cuit"]),
+            "email_dominio": dominio_email(u["email"]),
+            "telefono_norm": normalizar_telefono(u["telefono"]),
+            "dominio_web":   normalizar_dominio_web(u["sitio_web"]),
+        }
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lead_id = self._buscar(u, claves)
+
+        if lead_id is None:
+            columnas = list(u) + list(claves) + ["fuentes", "primera_vez", "ultima_vez"]
+            valores = list(u.values()) + list(claves.values()) + [fuente, ahora, ahora]
+            cursor = self.db.execute(
+                f"INSERT INTO leads ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})", valores)
+            lead_id = cursor.lastrowid
+            self.insertados += 1
+        else:
+            actual = self.db.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+            nuevos = {**u, **claves}
+            # Solo se completan campos vacíos: no se pisa lo que ya aportó otra fuente
+            cambios = {k: v for k, v in nuevos.items() if v and not actual[k]}
+            fuentes = set(filter(None, (actual["fuentes"] or "").split(",")))
+            cambios["fuentes"] = ",".join(sorted(fuentes | {fuente}))
+            cambios["ultima_vez"] = ahora
+            self.db.execute(
+                f"UPDATE leads SET {', '.join(f'{k} = ?' for k in cambios)} WHERE id = ?",
+                list(cambios.values()) + [lead_id])
+            self.actualizados += 1
+
+        clave = clave or claves["cuit_norm"] or claves["nombre_norm"] or u["nombre"]
+        self.db.execute(
+            "INSERT OR REPLACE INTO origenes (fuente, clave, lead_id, datos, actualizado) VALUES (?, ?, ?, ?, ?)",
+            (fuente, clave, lead_id, json.dumps(lead, ensure_ascii=False), ahora))
+
+        self._pendientes += 1
+        if self._pendientes >= self.commit_cada:
+            self.commit()
+        return lead_id
+
+    def origen(self, fuente, clave):
+        """Fila original que guardó la fuente con esa clave, o None"""
+        fila = self.db.execute("SELECT datos FROM origenes WHERE fuente = ? AND clave = ?", (fuente, clave)).fetchone()
+        return json.loads(fila["datos"]) if fila else None
+
+    def commit(self):
+        self.db.commit()
+        self._pendientes = 0
+
+    def exportar(self, ruta_csv, fuente=None):
+        """CSV de la base unificada, o de una fuente con su esquema original"""
+        self.commit()
+        with open(ruta_csv, "w", newline="", encoding="utf-8-sig") as f:
+            if fuente is None:
+                w = csv.writer(f)
+                w.writerow(CAMPOS)
+                cursor = self.db.execute(f"SELECT {', '.join(CAMPOS)} FROM leads ORDER BY id")
+                w.writerows(tuple(fila) for fila in cursor)
+                return self.db.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+            filas = [json.loads(f_["datos"]) for f_ in self.db.execute(
+                "SELECT datos FROM origenes WHERE fuente = ? ORDER BY rowid", (fuente,))]
+            campos = list(filas[0]) if filas else []
+            w = csv.DictWriter(f, fieldnames=campos, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(filas)
+            return len(filas)
+
+    def resumen(self):
+        return f"{self.insertados} empresas nuevas, {self.actualizados} ya conocidas"
+
+    def cerrar(self):
+        self.commit()
+        self.db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Base unificada de leads")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_exp = sub.add_parser("exportar", help="generar un CSV desde la base")
+    p_exp.add_argument("salida", nargs="?", default="leads_unificados.csv")
+    p_exp.add_argument("--fuente", help="maps, gba o pyme (por defecto: base unificada)")
+    p_imp = sub.add_parser("importar", help="cargar un CSV existente de un scraper")
+    p_imp.add_argument("csv")
+    p_imp.add_argument("fuente")
+    parser.add_argument("--db", default=RUTA_DB)
+    args = parser.parse_args()
+
+    store = LeadStore(args.db)
+    if args.comando == "exportar":
+        n = store.exportar(args.salida, args.fuente)
+        print(f"✅ {n} filas → {args.salida}", flush=True)
+    else:
+        with open(args.csv, newline="", encoding="utf-8-sig") as f:
+            for fila in csv.DictReader(f):
+                store.upsert(args.fuente, fila)
+        print(f"✅ {args.csv}: {store.resumen()}", flush=True)
+    store.cerrar()
+
+if __name__ == "__main__":
+    main()
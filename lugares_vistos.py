@@ -0,0 +1,65 @@
+"""
+Lugares de Maps ya leídos en corridas anteriores (SQLite), por ID de lugar.
+El ID sale del href del feed (…/data=!…!1s0x95bccb…:0x3f1a…!…), así que un
+lugar repetido se descarta antes de abrir su ficha, aunque venga de otra
+búsqueda o con otra URL; su fila se toma de la base de leads. Las entradas
+vencen por TTL: pasado ese tiempo el lugar se vuelve a leer para refrescar
+sus datos.
+"""
+
+import re
+import sqlite3
+import time
+
+DIA = 24 * 3600
+
+# Feature ID de Google (par hexa), o el place_id ChIJ… si el href solo trae ese
+_FEATURE_ID = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.I)
+_PLACE_ID = re.compile(r"!19s(ChIJ[\w-]+)")
+
+def id_lugar(href):
+    """ID estable del lugar, o "" si el href no lo trae"""
+    m = _FEATURE_ID.search(href or "")
+    if m:
+        return m.group(1).lower()
+    m = _PLACE_ID.search(href or "")
+    return m.group(1) if m else ""
+
+class LugaresVistos:
+    def __init__(self, ruta, ttl_dias=30, refrescar=False):
+        self.ttl = ttl_dias * DIA
+        self.salteados = 0
+        self.db = sqlite3.connect(ruta)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS lugares (
+                id      TEXT PRIMARY KEY,
+                nombre  TEXT NOT NULL,
+                visto   REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+        # En memoria para chequear sin await en el medio (lo comparten los contextos).
+        # refrescar: no se saltea nada, pero se sigue registrando lo leído.
+        limite = time.time() - self.ttl
+        self.vigentes = set() if refrescar else \
+            {fila[0] for fila in self.db.execute("SELECT id FROM lugares WHERE visto >= ?", (limite,))}
+
+    def __len__(self):
+        return len(self.vigentes)
+
+    def vigente(self, clave):
+        """True si el lugar se leyó hace menos del TTL"""
+        return clave in self.vigentes
+
+    def marcar(self, clave, nombre):
+        self.vigentes.add(clave)
+        self.db.execute("INSERT OR REPLACE INTO lugares (id, nombre, visto) VALUES (?, ?, ?)",
+                        (clave, nombre or "", time.time()))
+        self.db.commit()
+
+    def cerrar(self):
+        self.db.execute("DELETE FROM lugares WHERE visto < ?", (time.time() - self.ttl,))
+        self.db.commit()
+        self.db.close()
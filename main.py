@@ -3,12 +3,34 @@
 Versión GitHub Actions - con extracción de emails desde sitios web
 """
 
+import argparse
 import asyncio
-import csv
+import json
+import os
 import re
-import random
 from datetime import datetime
+import httpx
 from playwright.async_api import async_playwright
+from cache_emails import CacheEmails, normalizar_dominio
+from extractor_emails import extraer_emails
+from recursos import aplicar_perfil, resumen_bloqueos
+from ritmo import ControladorRitmo, es_captcha, host_de
+from salida_csv import EscritorCSV, filas_previas
+from estado_crawl import EstadoCrawl
+from leads_db import LeadStore, RUTA_DB
+from lugares_vistos import LugaresVistos, id_lugar
+from prefiltro_web import PrefiltroWeb, UTILES, RUTA_CACHE as CACHE_PREFILTRO
+from grabacion import preparar_contexto, transporte_httpx
+from shards import parsear as parsear_shard, le_toca, ruta_shard, describir
+import metricas
+from metricas import etapa, contar, contar_error
+
+# HTTP/2 solo si está instalado el paquete h2 (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
 BUSQUEDAS = [
     "fábrica textil Argentina",
@@ -24,8 +46,65 @@ BUSQUEDAS = [
 ]
 
 OUTPUT_FILE = "leads_textil_argentina.csv"
+CAMPOS = ["nombre", "telefono", "sitio_web", "direccion", "email", "busqueda_origen", "fecha", "id_lugar"]
+ESTADO_FILE = OUTPUT_FILE + ".estado"   # búsquedas y lugares ya guardados, para --resume
 MAX_POR_BUSQUEDA = 20
 
+# Enriquecimiento de emails en paralelo a la navegación de Maps
+WORKERS_EMAIL = 4      # páginas del navegador dedicadas a visitar sitios web
+MAX_POR_DOMINIO = 1    # visitas simultáneas a un mismo dominio
+MAX_RUTAS_SIMULTANEAS = 4  # páginas de contacto pedidas a la vez por dominio
+
+# Fichas de Maps abiertas en paralelo (en lugar de click + go_back en el feed)
+PESTANAS_MAPS = 5
+
+# Búsquedas repartidas en varios contextos aislados del navegador
+CONTEXTOS_MAPS = 3
+PERFILES_CONTEXTO = [
+    {"viewport": {"width": 1280, "height": 900}, "idioma": "es-AR,es,en-US;q=0.9"},
+    {"viewport": {"width": 1366, "height": 768}, "idioma": "es-AR,es;q=0.9,en;q=0.8"},
+    {"viewport": {"width": 1440, "height": 900}, "idioma": "es-419,es;q=0.9,en;q=0.7"},
+]
+# Contextos y páginas se cierran y se crean de nuevo cada tantas navegaciones
+# (o si la memoria JS pasa el tope), para que no crezcan sin límite
+RECICLAR_CADA_PAGINAS = 150
+RECICLAR_HEAP_MB = 400
+
+# Scroll del feed: se corta cuando deja de crecer (o al llegar a MAX_POR_BUSQUEDA)
+SCROLL_ESPERA_MS = 4000     # cuánto esperar resultados nuevos después de cada scroll
+SCROLL_SIN_CAMBIOS = 2      # scrolls seguidos sin resultados nuevos antes de cortar
+MAX_SCROLLS = 40            # tope de seguridad
+
+# Ritmo de navegación a Maps compartido por todos los contextos: se adapta
+# según los tiempos de respuesta y frena fuerte ante captchas o errores
+MAPS_ESPERA_INICIAL = 1.0
+MAPS_ESPERA_MIN = 0.3
+MAPS_ESPERA_MAX = 60.0
+
+# Ritmo propio (por host) para las visitas de Chromium a los sitios web
+WEB_ESPERA_INICIAL = 0.5
+WEB_ESPERA_MIN = 0.1
+WEB_ESPERA_MAX = 20.0
+
+# Cache persistente dominio → email (incluye dominios sin email)
+CACHE_EMAILS = "cache_emails.sqlite"
+CACHE_TTL_DIAS = 30
+CACHE_TTL_NEGATIVO_DIAS = 7
+CACHE_MAX_DOMINIOS = 50000
+
+# Lugares de Maps ya leídos en corridas anteriores, por ID de lugar: no se
+# vuelven a abrir hasta que pasa el TTL (--refrescar los lee todos)
+LUGARES_VISTOS = "lugares_vistos.sqlite"
+LUGARES_TTL_DIAS = 30
+
+# Aciertos por página de contacto de corridas anteriores: {path: [aciertos, intentos]}
+STATS_CONTACTO = "stats_contacto.json"
+
+HEADERS_WEB = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "es-AR,es,en-US;q=0.9",
+}
+
 # Páginas donde suelen estar los emails
 PAGINAS_CONTACTO = [
     "",           # homepage
@@ -37,160 +116,591 @@ PAGINAS_CONTACTO = [
     "/quienes-somos",
 ]
 
-def extraer_emails(texto):
-    if not texto: return []
-    return list(set(re.findall(r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}", texto)))
+# Marcas típicas de sitios que arman el contenido con JavaScript
+MARCAS_JS = ["__NEXT_DATA__", "data-reactroot", 'id="root"', 'id="app"', "ng-app",
+             "window.__NUXT__", "enable JavaScript", "habilitar JavaScript"]
+
+def parece_renderizado_js(html):
+    """Heurística: el HTML estático trae poco texto visible y depende de scripts"""
+    if not html: return False
+    if any(m in html for m in MARCAS_JS):
+        return True
+    sin_scripts = re.sub(r"(?is)<(script|style|noscript)[^>]*>.*?</\1>", " ", html)
+    texto = re.sub(r"(?s)<[^>]+>", " ", sin_scripts)
+    return len(" ".join(texto.split())) < 500 and "<script" in html.lower()
+
+def cargar_stats_rutas(ruta=STATS_CONTACTO):
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        contar_error("stats_contacto", e)
+        return {}
+
+def guardar_stats_rutas(stats, ruta=STATS_CONTACTO):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+
+def registrar_ruta(stats, path, acierto):
+    aciertos, intentos = stats.get(path, [0, 0])
+    stats[path] = [aciertos + (1 if acierto else 0), intentos + 1]
+
+def ordenar_rutas(stats):
+    """PAGINAS_CONTACTO ordenadas por tasa de acierto (suavizada) de corridas anteriores"""
+    def tasa(path):
+        aciertos, intentos = stats.get(path, [0, 0])
+        return (aciertos + 1) / (intentos + 2)
+    return sorted(PAGINAS_CONTACTO, key=tasa, reverse=True)
+
+stats_rutas = cargar_stats_rutas()
+ritmo = ControladorRitmo(MAPS_ESPERA_INICIAL, MAPS_ESPERA_MIN, MAPS_ESPERA_MAX)
+ritmo_web = ControladorRitmo(WEB_ESPERA_INICIAL, WEB_ESPERA_MIN, WEB_ESPERA_MAX)
 
 def limpiar(t):
     return t.strip().replace("\n", " ").replace(",", " ") if t else ""
 
+def clave_lugar(href):
+    """ID estable del lugar; si el href no lo trae, la URL sin parámetros de sesión"""
+    return id_lugar(href) or href.split("?")[0]
+
 def limpiar_url(url):
     """Quedarse solo con el dominio base"""
     if not url: return ""
     match = re.match(r"(https?://[^/]+)", url)
     return match.group(1) if match else url
 
-async def buscar_email_en_web(page, sitio_web):
-    """Visita el sitio web y páginas de contacto para encontrar emails"""
+async def probar_ruta(cliente, url, limite, dominio):
+    """GET de una página candidata → (emails válidos, parece armada con JS)"""
+    async with limite:
+        with etapa("contacto_http", dominio):
+            r = await cliente.get(url)
+    contar("paginas")
+    if r.status_code >= 400 or "html" not in r.headers.get("content-type", "text/html"):
+        return [], False
+    return extraer_emails(r.text, dominio), parece_renderizado_js(r.text)
+
+async def buscar_email_en_web(pagina, cliente, cache, sitio_web, prefiltro=None):
+    """Consulta el cache y solo si no hay dato vigente sale a buscar a la red"""
     if not sitio_web:
         return ""
-    
-    base = limpiar_url(sitio_web)
-    emails_encontrados = []
 
-    for path in PAGINAS_CONTACTO:
-        url = base + path
+    dominio = normalizar_dominio(limpiar_url(sitio_web))
+    hay_dato, email = cache.obtener(dominio)
+    if hay_dato:
+        return email
+
+    # Sitios caídos, estacionados o que no resuelven no llegan al navegador.
+    # No se guarda en el cache de emails: cuándo se reintenta lo decide el
+    # TTL del prefiltro según el estado (un muerto vuelve a probarse antes).
+    if prefiltro:
+        estado, destino, _ = await prefiltro.clasificar(sitio_web)
+        if estado not in UTILES:
+            contar(f"web_{estado}")
+            return ""
+        sitio_web = destino or sitio_web
+
+    with etapa("email"):
+        email = await buscar_email_en_red(pagina, cliente, sitio_web)
+    cache.guardar(dominio, email)
+    return email
+
+async def buscar_email_en_red(pagina, cliente, sitio_web):
+    """Busca emails con HTTP plano y usa el navegador solo en páginas armadas con JS"""
+    base = limpiar_url(sitio_web)
+    dominio = normalizar_dominio(base)
+    rutas = ordenar_rutas(stats_rutas)
+    rutas_js = []
+
+    # Camino rápido: todas las páginas candidatas a la vez, cortando en el primer email
+    limite = asyncio.Semaphore(MAX_RUTAS_SIMULTANEAS)
+    tareas = {asyncio.create_task(probar_ruta(cliente, base + path, limite, dominio)): path for path in rutas}
+    pendientes, procesadas = set(tareas), set()
+    try:
+        while pendientes:
+            hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in hechas:
+                path = tareas[tarea]
+                procesadas.add(tarea)
+                error = tarea.exception()
+                if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    return ""  # Sitio caído: no tiene sentido esperar el resto
+                if error:
+                    continue
+                emails, es_js = tarea.result()
+                registrar_ruta(stats_rutas, path, bool(emails))
+                if emails:
+                    return emails[0]  # El mejor rankeado alcanza, cancelamos el resto
+                if es_js:
+                    rutas_js.append(path)
+    finally:
+        for tarea in pendientes:
+            tarea.cancel()
+        # Al cortar antes: de las que ya terminaron se retira el resultado (o la
+        # excepción); las canceladas no llegaron a probar la ruta y no cuentan
+        for tarea, path in tareas.items():
+            if tarea in procesadas or tarea in pendientes:
+                continue
+            if not tarea.exception():
+                registrar_ruta(stats_rutas, path, bool(tarea.result()[0]))
+
+    # Fallback: Chromium solo donde el HTML estático no alcanza
+    for path in sorted(rutas_js, key=rutas.index):
         try:
-            await page.goto(url, wait_until="domcontentloaded", timeout=15000)
-            await asyncio.sleep(random.uniform(1, 2))
-            contenido = await page.content()
-            emails = extraer_emails(contenido)
-            # Filtrar emails genéricos/spam
-            emails = [e for e in emails if not any(x in e.lower() for x in 
-                      ["noreply", "no-reply", "example", "test", "spam", "sentry", "wix", "wordpress"])]
+            await ritmo_web.esperar_async(base)
+            page = await pagina.obtener()
+            with etapa("contacto_chromium", dominio):
+                inicio = asyncio.get_running_loop().time()
+                try:
+                    respuesta = await page.goto(base + path, wait_until="domcontentloaded", timeout=15000)
+                except Exception:
+                    ritmo_web.registrar(base, error=True)
+                    raise
+                ritmo_web.registrar(base, status=respuesta.status if respuesta else None,
+                                    duracion=asyncio.get_running_loop().time() - inicio, url=page.url)
+                # Esperar lo que tarde el JS en armar la página, no un tiempo fijo
+                try: await page.wait_for_load_state("networkidle", timeout=5000)
+                except Exception as e: contar_error("espera_networkidle", e)
+                contenido = await page.content()
+            emails = extraer_emails(contenido, dominio)
             if emails:
-                emails_encontrados.extend(emails)
-                break  # Con uno alcanza, no seguimos buscando
+                stats_rutas[path][0] += 1  # El intento ya se contó en el camino HTTP
+                return emails[0]
         except Exception:
             continue
 
-    if emails_encontrados:
-        return emails_encontrados[0]
     return ""
 
-async def scrape():
-    leads = []
-    vistos = set()
+# Nombre y URL de todos los lugares del feed en una sola pasada
+JS_LUGARES_FEED = """
+() => Array.from(document.querySelectorAll('a[href*="/maps/place/"]')).map(a => ({
+    href: a.href,
+    nombre: a.getAttribute('aria-label') || '',
+}))
+"""
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--lang=es-AR"]
-        )
+# Scrollea el feed y espera (con MutationObserver) a que aparezcan lugares nuevos
+JS_SCROLL_FEED = """
+(espera) => new Promise(resolve => {
+    const feed = document.querySelector('div[role="feed"]');
+    if (!feed) return resolve({total: -1, fin: true});
+    const contar = () => feed.querySelectorAll('a[href*="/maps/place/"]').length;
+    const fin = () => /final de la lista|end of the list/i.test(feed.lastElementChild ? feed.lastElementChild.innerText : '');
+    const antes = contar();
+    let timer;
+    const obs = new MutationObserver(() => {
+        if (contar() > antes || fin()) { obs.disconnect(); clearTimeout(timer); resolve({total: contar(), fin: fin()}); }
+    });
+    obs.observe(feed, {childList: true, subtree: true});
+    timer = setTimeout(() => { obs.disconnect(); resolve({total: contar(), fin: fin()}); }, espera);
+    feed.scrollBy(0, feed.scrollHeight);
+})
+"""
 
-        # Dos contextos: uno para Maps, otro para los sitios web
-        maps_page = await browser.new_page()
-        web_page = await browser.new_page()
+# Todos los datos de la ficha de un lugar en un solo evaluate
+JS_DETALLE_LUGAR = """
+() => {
+    const texto = sel => { const e = document.querySelector(sel); return e ? e.innerText : ''; };
+    const web = document.querySelector('[data-item-id*="authority"] a, a[data-item-id*="authority"]');
+    return {
+        nombre:    texto('h1.DUwDvf'),
+        direccion: texto('[data-item-id="address"] .Io6YTe'),
+        telefono:  texto('[data-item-id*="phone"] .Io6YTe'),
+        sitio_web: web ? (web.getAttribute('href') || '') : '',
+    };
+}
+"""
 
-        await maps_page.set_extra_http_headers({"Accept-Language": "es-AR,es,en-US;q=0.9"})
-        await maps_page.set_viewport_size({"width": 1280, "height": 900})
+async def navegar_maps(page, url, selector, timeout):
+    """goto a Maps respetando el ritmo compartido y reportándole cómo respondió"""
+    await ritmo.esperar_async(url)
+    inicio = asyncio.get_running_loop().time()
+    try:
+        with etapa("maps_goto", host_de(url)):
+            respuesta = await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+        if es_captcha(page.url):
+            contar("captchas")
+            raise Exception(f"captcha de Google ({page.url[:60]})")
+        with etapa("maps_selector"):
+            await page.wait_for_selector(selector, timeout=15000)
+    except Exception:
+        ritmo.registrar(url, error=True, url=page.url)
+        raise
+    ritmo.registrar(url, status=respuesta.status if respuesta else None,
+                    duracion=asyncio.get_running_loop().time() - inicio, url=page.url)
+    contar("paginas")
+
+async def leer_lugar(pestanas, lugar):
+    """Abre la ficha del lugar en una pestaña libre del pool y lee todo de una vez"""
+    page = await pestanas.get()
+    try:
+        with etapa("ficha_maps"):
+            await navegar_maps(page, lugar["href"], "h1.DUwDvf", 30000)
+            try: await page.wait_for_selector("[data-item-id]", timeout=3000)
+            except Exception as e: contar_error("espera_datos_ficha", e)
+            datos = await page.evaluate(JS_DETALLE_LUGAR)
+        datos["nombre"] = datos["nombre"] or lugar["nombre"]
+        datos["href"] = lugar["href"]
+        return datos
+    finally:
+        pestanas.put_nowait(page)
+
+async def lanzar_navegador(p):
+    return await p.chromium.launch(
+        headless=True,
+        args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--lang=es-AR"]
+    )
+
+def crear_cliente_http():
+    """Cliente HTTP compartido: keep-alive y reutilización de conexiones por host"""
+    return httpx.AsyncClient(
+        headers=HEADERS_WEB,
+        follow_redirects=True,
+        timeout=httpx.Timeout(15.0, connect=8.0),
+        transport=transporte_httpx(
+            http2=HTTP2,
+            limits=httpx.Limits(max_connections=WORKERS_EMAIL * 4, max_keepalive_connections=WORKERS_EMAIL * 2),
+        ),
+    )
+
+async def memoria_js_mb(page):
+    """Heap JS usado por la página (solo Chromium); 0 si no se puede medir"""
+    try:
+        return await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : 0") / 2**20
+    except Exception as e:
+        contar_error("memoria_js", e)
+        return 0
+
+class PaginaReciclable:
+    """Página para los sitios web en un contexto propio. Se crea recién cuando
+    hace falta el navegador y se reemplaza cada RECICLAR_CADA_PAGINAS usos."""
+    def __init__(self, browser):
+        self.browser = browser
+        self.page = None
+        self.usos = 0
+
+    async def obtener(self):
+        if self.page is not None and self.usos >= RECICLAR_CADA_PAGINAS:
+            await self.cerrar()
+            contar("reciclados", host="web")
+        if self.page is None:
+            self.page = await self.browser.new_page()
+            await preparar_contexto(self.page.context, "web")
+            await aplicar_perfil(self.page, "email")
+        self.usos += 1
+        return self.page
+
+    async def cerrar(self):
+        # Cerrar el contexto explícitamente: ahí se escribe el HAR al grabar
+        if self.page is not None:
+            await self.page.context.close()
+        self.page, self.usos = None, 0
+
+class SesionMaps:
+    """Un contexto aislado (viewport e idioma propios) con la página del feed
+    y el pool de pestañas para abrir las fichas de los lugares en paralelo"""
+    def __init__(self, browser, perfil):
+        self.browser = browser
+        self.perfil = perfil
+        self.contexto = None
+        self.paginas = 0    # navegaciones desde que se creó el contexto
+
+    async def abrir(self):
+        self.contexto = await self.browser.new_context(
+            viewport=self.perfil["viewport"],
+            locale="es-AR",
+            extra_http_headers={"Accept-Language": self.perfil["idioma"]},
+        )
+        await preparar_contexto(self.contexto, "maps")
+        await aplicar_perfil(self.contexto, "maps")
+        self.maps_page = await self.contexto.new_page()
+        self.pestanas = asyncio.Queue()
+        for _ in range(PESTANAS_MAPS):
+            self.pestanas.put_nowait(await self.contexto.new_page())
+        self.paginas = 0
+        return self
+
+    async def sana(self):
+        """Chequeo rápido: el navegador responde y la sesión no pasó los topes"""
+        if not self.browser.is_connected() or self.paginas >= RECICLAR_CADA_PAGINAS:
+            return False
+        try:
+            await asyncio.wait_for(self.maps_page.evaluate("1"), timeout=5)
+        except Exception as e:
+            contar_error("salud_sesion", e)
+            return False
+        return await memoria_js_mb(self.maps_page) < RECICLAR_HEAP_MB
+
+    async def reciclar(self):
+        await self.cerrar()
+        contar("reciclados", host="maps")
+        return await self.abrir()
+
+    async def cerrar(self):
+        try:
+            await self.contexto.close()
+        except Exception as e:
+            contar_error("cerrar_sesion", e)
+
+class Salida:
+    """Escribe leads (CSV y base unificada) y registra qué lugares y búsquedas quedaron completos"""
+    def __init__(self, escritor, estado, store, lugares=None):
+        self.escritor = escritor
+        self.estado = estado
+        self.store = store
+        self.lugares = lugares      # LugaresVistos de corridas anteriores (opcional)
+        self.esperando_email = {}   # búsqueda → leads encolados para buscar email
+        self.recorridas = set()     # búsquedas con la parte de Maps terminada
+
+    def encolado(self, busqueda):
+        self.esperando_email[busqueda] = self.esperando_email.get(busqueda, 0) + 1
+
+    def escribir(self, lead, clave_lugar, desde_cola=False):
+        with etapa("escritura"):
+            self.escritor.escribir(lead)
+            self.store.upsert("maps", lead, clave=clave_lugar)
+        self._marcar_lugar(clave_lugar)
+        if self.lugares:
+            self.lugares.marcar(clave_lugar, lead["nombre"])
+        if desde_cola:
+            self.esperando_email[lead["busqueda_origen"]] -= 1
+        self._cerrar_busqueda(lead["busqueda_origen"])
+
+    def reutilizar(self, lead, clave_lugar):
+        """Lugar leído en una corrida anterior: su fila guardada va al CSV sin abrir la ficha"""
+        with etapa("escritura"):
+            self.escritor.escribir(lead)
+        self._marcar_lugar(clave_lugar)
+
+    def _marcar_lugar(self, clave_lugar):
+        self.estado.marcar(f"lugar:{clave_lugar}")
+
+    def busqueda_recorrida(self, busqueda):
+        self.recorridas.add(busqueda)
+        self._cerrar_busqueda(busqueda)
+
+    def _cerrar_busqueda(self, busqueda):
+        # Una búsqueda está completa cuando Maps terminó y todos sus leads están escritos
+        if busqueda in self.recorridas and not self.esperando_email.get(busqueda):
+            self.estado.marcar(f"busqueda:{busqueda}")
+
+async def worker_emails(pagina, cliente, cache, cola, semaforos, prefiltro=None):
+    """Toma leads de la cola y completa el email visitando su sitio web"""
+    while True:
+        lead, sitio_web, clave, salida = await cola.get()
+        try:
+            dominio = limpiar_url(sitio_web)
+            semaforo = semaforos.setdefault(dominio, asyncio.Semaphore(MAX_POR_DOMINIO))
+            email = ""
+            async with semaforo:
+                try:
+                    email = await buscar_email_en_web(pagina, cliente, cache, sitio_web, prefiltro)
+                except Exception as e:
+                    contar_error("email", e)
+            lead["email"] = limpiar(email)
+            estado_email = f"📧 {email}" if email else "❌ sin email"
+            print(f"   🌐 {lead['nombre']} | {estado_email}", flush=True)
+            salida.escribir(lead, clave, desde_cola=True)
+        finally:
+            cola.task_done()
+
+async def scrollear_feed(maps_page, maximo=MAX_POR_BUSQUEDA):
+    """Scrollea mientras el feed siga creciendo y falten resultados"""
+    anterior, sin_cambios = 0, 0
+    for _ in range(MAX_SCROLLS):
+        try:
+            with etapa("maps_scroll"):
+                estado = await maps_page.evaluate(JS_SCROLL_FEED, SCROLL_ESPERA_MS)
+        except Exception:
+            break
+        total = estado["total"]
+        if total < 0 or estado["fin"] or total >= maximo:
+            break
+        if total > anterior:
+            anterior, sin_cambios = total, 0
+            continue
+        sin_cambios += 1
+        if sin_cambios >= SCROLL_SIN_CAMBIOS:
+            break
+
+async def procesar_busqueda(maps_page, pestanas, busqueda, vistos, leads, cola_emails, salida, maximo=MAX_POR_BUSQUEDA):
+    """Recorre una búsqueda y devuelve cuántas páginas de Maps abrió"""
+    print(f"\n🔍 {busqueda}", flush=True)
+    url = "https://www.google.com/maps/search/" + busqueda.replace(" ", "+")
+    await navegar_maps(maps_page, url, 'div[role="feed"], h1.DUwDvf', 60000)
+    await scrollear_feed(maps_page, maximo)
+    lugares = await maps_page.evaluate(JS_LUGARES_FEED)
+    print(f"   → {busqueda}: {len(lugares)} resultados", flush=True)
+
+    # Dedup antes de abrir nada: el ID del lugar y el nombre ya vienen en el
+    # feed. Chequear y agregar sin await en el medio mantiene vistos
+    # consistente entre contextos.
+    a_leer, conocidos = [], 0
+    for lugar in lugares[:maximo]:
+        nombre = limpiar(lugar["nombre"])
+        clave = clave_lugar(lugar["href"])
+        if not nombre or nombre in vistos or clave in vistos or salida.estado.hecho(f"lugar:{clave}"):
+            continue
+        vistos.update((nombre, clave))
+        guardado = salida.store.origen("maps", clave) if salida.lugares and salida.lugares.vigente(clave) else None
+        if guardado:
+            guardado["id_lugar"] = clave
+            leads.append(guardado)
+            salida.reutilizar(guardado, clave)
+            salida.lugares.salteados += 1
+            conocidos += 1
+            continue
+        a_leer.append(lugar)
+    if conocidos:
+        contar("lugares_conocidos", conocidos)
+        print(f"   ⏩ {busqueda}: {conocidos} lugares ya leídos en corridas anteriores (fila tomada de la base)", flush=True)
 
+    count = 0
+    for tarea in asyncio.as_completed([leer_lugar(pestanas, l) for l in a_leer]):
+        try:
+            datos = await tarea
+        except Exception:
+            continue  # Ya contado como error de ficha_maps
+
+        nombre, telefono, sitio_web = datos["nombre"], datos["telefono"], datos["sitio_web"]
+        lead = {
+            "nombre": limpiar(nombre),
+            "telefono": limpiar(telefono),
+            "sitio_web": limpiar(sitio_web),
+            "direccion": limpiar(datos["direccion"]),
+            "email": "",
+            "busqueda_origen": busqueda,
+            "fecha": datetime.now().strftime("%Y-%m-%d"),
+            "id_lugar": clave_lugar(datos["href"]),
+        }
+        leads.append(lead)
+        count += 1
+        print(f"   ✅ [{busqueda[:25]} #{count}] {nombre} | {telefono}", flush=True)
+
+        # El email se busca en segundo plano mientras seguimos en Maps;
+        # el lead se escribe cuando el worker termina con su sitio web
+        if sitio_web:
+            salida.encolado(busqueda)
+            cola_emails.put_nowait((lead, sitio_web, lead["id_lugar"], salida))
+        else:
+            salida.escribir(lead, lead["id_lugar"])
+
+    salida.busqueda_recorrida(busqueda)
+    return 1 + len(a_leer)
+
+async def worker_busquedas(browser, perfil, cola_busquedas, vistos, leads, cola_emails, salida):
+    """Una SesionMaps que va tomando búsquedas de la cola"""
+    sesion = await SesionMaps(browser, perfil).abrir()
+    while not cola_busquedas.empty():
+        busqueda = cola_busquedas.get_nowait()
+        if sesion.paginas >= RECICLAR_CADA_PAGINAS:
+            await sesion.reciclar()
+        try:
+            sesion.paginas += await procesar_busqueda(sesion.maps_page, sesion.pestanas, busqueda,
+                                                      vistos, leads, cola_emails, salida)
+        except Exception as e:
+            contar_error("busqueda", e)
+            print(f"   ❌ Error en '{busqueda}': {e}", flush=True)
+    await sesion.cerrar()
+
+async def scrape(salida, previos=(), shard=None):
+    leads = list(previos)
+    vistos = {fila["nombre"] for fila in previos}
+
+    # Cada shard enriquece sus propios leads con su cache y sus stats: los
+    # dominios no se reparten, así que dos shards pueden sondear el mismo sitio.
+    # Las stats de rutas arrancan de las globales si el shard no tiene propias.
+    ruta_stats = ruta_shard(STATS_CONTACTO, shard)
+    if os.path.exists(ruta_stats):
+        stats_rutas.clear()
+        stats_rutas.update(cargar_stats_rutas(ruta_stats))
+    cliente = crear_cliente_http()
+    cache = CacheEmails(ruta_shard(CACHE_EMAILS, shard), CACHE_TTL_DIAS, CACHE_TTL_NEGATIVO_DIAS, CACHE_MAX_DOMINIOS)
+    prefiltro = PrefiltroWeb(ruta_shard(CACHE_PREFILTRO, shard))
+
+    async with cliente, async_playwright() as p:
+        browser = await lanzar_navegador(p)
+
+        # Pool de páginas para los sitios web
+        cola_emails = asyncio.Queue()
+        semaforos = {}
+        web_pages = [PaginaReciclable(browser) for _ in range(WORKERS_EMAIL)]
+        workers = [asyncio.create_task(worker_emails(pagina, cliente, cache, cola_emails, semaforos, prefiltro))
+                   for pagina in web_pages]
+
+        # Búsquedas repartidas entre CONTEXTOS_MAPS contextos con un ritmo común
+        cola_busquedas = asyncio.Queue()
         for busqueda in BUSQUEDAS:
-            print(f"\n🔍 {busqueda}", flush=True)
-            url = "https://www.google.com/maps/search/" + busqueda.replace(" ", "+")
-            try:
-                await maps_page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                await asyncio.sleep(random.uniform(4, 6))
-
-                for _ in range(6):
-                    try:
-                        await maps_page.evaluate('document.querySelector(\'div[role="feed"]\').scrollBy(0,1500)')
-                        await asyncio.sleep(random.uniform(1.5, 2.5))
-                    except:
-                        break
-
-                resultados = await maps_page.locator('a[href*="/maps/place/"]').all()
-                print(f"   → {len(resultados)} resultados", flush=True)
-
-                count = 0
-                for r in resultados[:MAX_POR_BUSQUEDA]:
-                    try:
-                        await r.click()
-                        await asyncio.sleep(random.uniform(2, 3.5))
-
-                        nombre = ""
-                        try: nombre = await maps_page.locator("h1.DUwDvf").inner_text(timeout=5000)
-                        except: pass
-
-                        if not nombre or nombre in vistos:
-                            await maps_page.go_back()
-                            await asyncio.sleep(1.5)
-                            continue
-                        vistos.add(nombre)
-
-                        direccion = ""
-                        try: direccion = await maps_page.locator('[data-item-id="address"] .Io6YTe').inner_text(timeout=3000)
-                        except: pass
-
-                        telefono = ""
-                        try: telefono = await maps_page.locator('[data-item-id*="phone"] .Io6YTe').inner_text(timeout=3000)
-                        except: pass
-
-                        sitio_web = ""
-                        try: sitio_web = await maps_page.locator('[data-item-id*="authority"] a').get_attribute("href", timeout=3000)
-                        except: pass
-
-                        # Buscar email en el sitio web
-                        email = ""
-                        if sitio_web:
-                            print(f"   📧 Buscando email en {sitio_web}...", flush=True)
-                            try:
-                                email = await buscar_email_en_web(web_page, sitio_web)
-                            except Exception:
-                                pass
-
-                        leads.append({
-                            "nombre": limpiar(nombre),
-                            "telefono": limpiar(telefono),
-                            "sitio_web": limpiar(sitio_web),
-                            "direccion": limpiar(direccion),
-                            "email": limpiar(email),
-                            "busqueda_origen": busqueda,
-                            "fecha": datetime.now().strftime("%Y-%m-%d"),
-                        })
-                        count += 1
-                        estado_email = f"📧 {email}" if email else "❌ sin email"
-                        print(f"   ✅ [{count}] {nombre} | {telefono} | {estado_email}", flush=True)
-
-                        await maps_page.go_back()
-                        await asyncio.sleep(random.uniform(1.5, 3))
-
-                    except Exception as e:
-                        try: await maps_page.go_back(); await asyncio.sleep(1.5)
-                        except: pass
-
-            except Exception as e:
-                print(f"   ❌ Error: {e}", flush=True)
-
+            if not le_toca(f"maps:{busqueda}", shard):
+                continue
+            if salida.estado.hecho(f"busqueda:{busqueda}"):
+                print(f"⏩ '{busqueda}' ya completa en la corrida anterior", flush=True)
+                continue
+            cola_busquedas.put_nowait(busqueda)
+        await asyncio.gather(*(
+            worker_busquedas(browser, PERFILES_CONTEXTO[i % len(PERFILES_CONTEXTO)],
+                             cola_busquedas, vistos, leads, cola_emails, salida)
+            for i in range(min(CONTEXTOS_MAPS, cola_busquedas.qsize()))
+        ))
+
+        pendientes = cola_emails.qsize()
+        if pendientes:
+            print(f"\n📧 Esperando {pendientes} sitios web pendientes...", flush=True)
+        await cola_emails.join()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        for pagina in web_pages:
+            await pagina.cerrar()
         await browser.close()
+    print(f"⏱️  Ritmo Maps: {ritmo.resumen()}", flush=True)
+    print(f"⏱️  Ritmo sitios web: {ritmo_web.resumen()}", flush=True)
+    print(f"🚫 Recursos: {resumen_bloqueos()}", flush=True)
+    print(f"📈 Etapas: {metricas.resumen()}", flush=True)
+    print(f"🗃️  Cache de emails: {cache.hits} dominios reutilizados, {cache.misses} visitados", flush=True)
+    print(f"🔎 Prefiltro web: {prefiltro.resumen()}", flush=True)
+    await prefiltro.cerrar()
+    cache.cerrar()
+    guardar_stats_rutas(stats_rutas, ruta_stats)
     return leads
 
-def guardar_csv(leads):
-    campos = ["nombre", "telefono", "sitio_web", "direccion", "email", "busqueda_origen", "fecha"]
-    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=campos)
-        w.writeheader()
-        w.writerows(leads)
-
 async def main():
+    parser = argparse.ArgumentParser(description="Scraper Google Maps - Fabricantes Textil Argentina")
+    parser.add_argument("--resume", action="store_true", help="retomar una corrida interrumpida")
+    parser.add_argument("--shard", type=parsear_shard, help="i/N: correr solo la parte i de N de las búsquedas")
+    parser.add_argument("--refrescar", action="store_true", help="volver a leer también los lugares vistos hace menos del TTL")
+    args = parser.parse_args()
+    # Cada shard con sus propios archivos; después se unen con shards.py
+    output, estado_crawl = ruta_shard(OUTPUT_FILE, args.shard), ruta_shard(ESTADO_FILE, args.shard)
+
     print("=" * 55, flush=True)
     print("🧵 SCRAPER TEXTIL ARGENTINA", flush=True)
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+    if args.shard:
+        mias = sum(1 for b in BUSQUEDAS if le_toca(f"maps:{b}", args.shard))
+        print(f"🧩 {describir(args.shard)}: {mias} de {len(BUSQUEDAS)} búsquedas → {output}", flush=True)
     print("=" * 55, flush=True)
-    leads = await scrape()
-    guardar_csv(leads)
-    print(f"\n✅ {len(leads)} leads guardados en {OUTPUT_FILE}", flush=True)
+    previos = filas_previas(output) if args.resume else []
+    if previos:
+        print(f"⏩ Reanudando: {len(previos)} leads ya guardados", flush=True)
+
+    estado = EstadoCrawl(estado_crawl, reanudar=args.resume)
+    store = LeadStore(ruta_shard(RUTA_DB, args.shard))
+    lugares = LugaresVistos(ruta_shard(LUGARES_VISTOS, args.shard), LUGARES_TTL_DIAS, refrescar=args.refrescar)
+    if len(lugares):
+        print(f"🗺️  {len(lugares)} lugares leídos en los últimos {LUGARES_TTL_DIAS} días no se vuelven a abrir", flush=True)
+    with EscritorCSV(output, CAMPOS, continuar=args.resume) as escritor:
+        leads = await scrape(Salida(escritor, estado, store, lugares), previos, args.shard)
+    estado.terminar()
+    print(f"⏩ {lugares.salteados} lugares ya conocidos tomados de la base sin abrir la ficha", flush=True)
+    lugares.cerrar()
+    print(f"🗄️  Base de leads: {store.resumen()}", flush=True)
+    store.cerrar()
+    print(f"\n✅ {len(leads)} leads guardados en {output}", flush=True)
     con_email = sum(1 for l in leads if l["email"])
     print(f"📧 {con_email} leads con email ({round(con_email/len(leads)*100 if leads else 0)}%)", flush=True)
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
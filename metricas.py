@@ -0,0 +1,166 @@
+"""
+Métricas de la corrida: tiempos por etapa y por host (con histograma de
+latencias), contadores y errores/timeouts por etapa.
+- Al terminar el proceso se agregan al reporte JSON-lines METRICAS_ARCHIVO
+  (por defecto metricas.jsonl), una línea por serie con el id de la corrida.
+- Con METRICAS_PUERTO=<puerto> se sirven en formato de texto de Prometheus
+  en http://0.0.0.0:<puerto>/metrics mientras dura la corrida.
+Registrar un evento es un lock y un par de sumas: se puede dejar siempre
+activo. Con tareas en paralelo el tiempo acumulado de una etapa puede
+superar la duración total de la corrida.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ARCHIVO = os.environ.get("METRICAS_ARCHIVO", "metricas.jsonl")
+PUERTO = os.environ.get("METRICAS_PUERTO", "")
+
+# Límites (segundos) de los buckets del histograma de latencias
+LIMITES = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# Tope de hosts distintos por etapa; el resto se agrupa en "otros"
+MAX_HOSTS = 100
+
+CORRIDA = f"{os.path.basename(sys.argv[0] or 'python')}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+INICIO = time.time()
+
+ETAPAS = {}         # (etapa, host) → {"segundos", "veces", "buckets"}
+CONTADORES = {}     # (nombre, host) → n
+ERRORES = {}        # (etapa, tipo) → n
+_hosts = {}         # etapa → hosts vistos
+_lock = threading.Lock()
+
+def _host(nombre, host):
+    if not host:
+        return ""
+    vistos = _hosts.setdefault(nombre, set())
+    if host not in vistos:
+        if len(vistos) >= MAX_HOSTS:
+            return "otros"
+        vistos.add(host)
+    return host
+
+def observar(nombre, segundos, host=None):
+    """Suma una duración ya medida a la etapa"""
+    with _lock:
+        clave = (nombre, _host(nombre, host))
+        serie = ETAPAS.get(clave)
+        if serie is None:
+            serie = ETAPAS[clave] = {"segundos": 0.0, "veces": 0, "buckets": [0] * (len(LIMITES) + 1)}
+        serie["segundos"] += segundos
+        serie["veces"] += 1
+        serie["buckets"][bisect.bisect_left(LIMITES, segundos)] += 1
+
+@contextmanager
+def etapa(nombre, host=None):
+    """Mide el bloque; si sale con una excepción también la cuenta como error de la etapa"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception as e:  # La cancelación de tareas no es un error
+        contar_error(nombre, e)
+        raise
+    finally:
+        observar(nombre, time.perf_counter() - inicio, host)
+
+def contar(nombre, n=1, host=None):
+    with _lock:
+        clave = (nombre, _host(nombre, host))
+        CONTADORES[clave] = CONTADORES.get(clave, 0) + n
+
+def contar_error(nombre, excepcion):
+    """Cuenta una excepción (o timeout) de la etapa, en lugar de tragarla en silencio"""
+    tipo = type(excepcion).__name__
+    if "Timeout" in tipo or "timeout" in str(excepcion)[:200].lower():
+        tipo = "timeout"
+    with _lock:
+        ERRORES[(nombre, tipo)] = ERRORES.get((nombre, tipo), 0) + 1
+
+def lineas():
+    """Series del reporte, una por línea JSON"""
+    with _lock:
+        filas = [{"tipo": "corrida", "segundos": round(time.time() - INICIO, 3)}]
+        for (nombre, host), s in ETAPAS.items():
+            filas.append({"tipo": "etapa", "nombre": nombre, "host": host, "segundos": round(s["segundos"], 4),
+                          "veces": s["veces"], "buckets": dict(zip([str(l) for l in LIMITES] + ["+Inf"], s["buckets"]))})
+        for (nombre, host), n in CONTADORES.items():
+            filas.append({"tipo": "contador", "nombre": nombre, "host": host, "valor": n})
+        for (nombre, tipo), n in ERRORES.items():
+            filas.append({"tipo": "error", "nombre": nombre, "error": tipo, "valor": n})
+    for fila in filas:
+        fila["corrida"] = CORRIDA
+    return filas
+
+def guardar(ruta=None):
+    ruta = ruta or ARCHIVO
+    if not ruta:
+        return
+    with open(ruta, "a", encoding="utf-8") as f:
+        for fila in lineas():
+            f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+def resumen(n=5):
+    """Las n etapas con más tiempo acumulado y el total de errores, para el log"""
+    por_etapa = {}
+    for fila in lineas():
+        if fila["tipo"] == "etapa":
+            por_etapa[fila["nombre"]] = por_etapa.get(fila["nombre"], 0) + fila["segundos"]
+    with _lock:
+        errores = sum(ERRORES.values())
+    top = sorted(por_etapa.items(), key=lambda x: -x[1])[:n]
+    return " | ".join(f"{e} {s:.1f}s" for e, s in top) + f" | {errores} errores"
+
+def _etiquetas(**kw):
+    return ",".join(f'{k}="{str(v)}"' for k, v in kw.items() if v != "")
+
+def prometheus():
+    """Texto en el formato de exposición de Prometheus"""
+    salida = ["# TYPE scraper_etapa_segundos histogram",
+              "# TYPE scraper_eventos_total counter",
+              "# TYPE scraper_errores_total counter"]
+    for fila in lineas():
+        if fila["tipo"] == "etapa":
+            acumulado = 0
+            for le, n in fila["buckets"].items():
+                acumulado += n
+                salida.append(f"scraper_etapa_segundos_bucket{{{_etiquetas(etapa=fila['nombre'], host=fila['host'], le=le)}}} {acumulado}")
+            etiquetas = _etiquetas(etapa=fila["nombre"], host=fila["host"])
+            salida.append(f"scraper_etapa_segundos_sum{{{etiquetas}}} {fila['segundos']}")
+            salida.append(f"scraper_etapa_segundos_count{{{etiquetas}}} {fila['veces']}")
+        elif fila["tipo"] == "contador":
+            salida.append(f"scraper_eventos_total{{{_etiquetas(nombre=fila['nombre'], host=fila['host'])}}} {fila['valor']}")
+        elif fila["tipo"] == "error":
+            salida.append(f"scraper_errores_total{{{_etiquetas(etapa=fila['nombre'], tipo=fila['error'])}}} {fila['valor']}")
+    return "\n".join(salida) + "\n"
+
+def iniciar_servidor(puerto):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            encontrado = self.path.startswith("/metrics")
+            cuerpo = prometheus().encode() if encontrado else b""
+            self.send_response(200 if encontrado else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("0.0.0.0", int(puerto)), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+if PUERTO:
+    iniciar_servidor(PUERTO)
+
+atexit.register(guardar)
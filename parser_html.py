@@ -0,0 +1,137 @@
+"""
+Capa de parseo HTML compartida por los scrapers.
+Usa lxml (en C) como motor de BeautifulSoup si está instalado y cae a
+"html.parser" si no. Se puede forzar con la variable PARSER_HTML.
+También ofrece un parser incremental de tablas (filas_tabla) para
+documentos grandes que no conviene cargar enteros en memoria.
+"""
+
+import os
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+def _motor_por_defecto():
+    forzado = os.environ.get("PARSER_HTML")
+    if forzado:
+        return forzado
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+MOTOR = _motor_por_defecto()
+
+def crear_soup(html, motor=None):
+    """Parsea el documento una sola vez; el árbol se comparte entre extractores"""
+    return BeautifulSoup(html, motor or MOTOR)
+
+def filas_tabla(trozos, motor=None):
+    """
+    Genera las filas <tr> de la primera tabla a medida que llegan los trozos
+    de HTML (str). Cada fila es la lista de sus celdas <td>, y cada celda la
+    lista de sus fragmentos de texto, para poder unirlos como get_text()
+    ("".join) o get_text(separator="\n") ("\n".join).
+    """
+    if (motor or MOTOR) == "lxml":
+        return _filas_lxml(trozos)
+    return _filas_html_parser(trozos)
+
+def _filas_lxml(trozos):
+    from lxml import etree
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    primera = None
+
+    def eventos():
+        for trozo in trozos:
+            parser.feed(trozo)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    for evento, elem in eventos():
+        if evento == "start":
+            if elem.tag == "table" and primera is None:
+                primera = elem
+            continue
+        if elem is primera:
+            return
+        if elem.tag == "tr" and primera is not None and next(elem.iterancestors("table"), None) is primera:
+            yield [list(td.itertext()) for td in elem.iter("td")]
+            # Liberar lo ya emitido para que la memoria no crezca con el documento
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+class _ParserFilas(HTMLParser):
+    """Fallback sin lxml: mismo recorrido con el parser incremental de la stdlib"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.listas = []        # filas completas pendientes de emitir
+        self.nivel = 0          # anidamiento de tablas dentro de la primera
+        self.terminada = False
+        self.fila = None
+        self.celda = None
+        self.seguido = False    # el último evento fue texto (un trozo puede cortarlo)
+
+    def handle_starttag(self, tag, attrs):
+        self.seguido = False
+        if self.terminada:
+            return
+        if tag == "table":
+            self.nivel += 1
+        elif self.nivel == 1 and tag == "tr":
+            self._cerrar_fila()
+            self.fila = []
+        elif self.nivel == 1 and tag == "td" and self.fila is not None:
+            self._cerrar_celda()
+            self.celda = []
+
+    def handle_endtag(self, tag):
+        self.seguido = False
+        if self.terminada or not self.nivel:
+            return
+        if tag == "td":
+            self._cerrar_celda()
+        elif tag == "tr":
+            self._cerrar_fila()
+        elif tag == "table":
+            self.nivel -= 1
+            if self.nivel == 0:
+                self._cerrar_fila()
+                self.terminada = True
+
+    def handle_data(self, data):
+        if self.celda is None:
+            return
+        if self.seguido and self.celda:
+            self.celda[-1] += data
+        else:
+            self.celda.append(data)
+        self.seguido = True
+
+    def handle_comment(self, data):
+        self.seguido = False
+
+    def _cerrar_celda(self):
+        if self.celda is not None and self.fila is not None:
+            self.fila.append(self.celda)
+        self.celda = None
+
+    def _cerrar_fila(self):
+        self._cerrar_celda()
+        if self.fila is not None:
+            self.listas.append(self.fila)
+        self.fila = None
+
+def _filas_html_parser(trozos):
+    parser = _ParserFilas()
+    for trozo in trozos:
+        parser.feed(trozo)
+        yield from parser.listas
+        parser.listas = []
+        if parser.terminada:
+            return
+    parser.close()
+    parser._cerrar_fila()
+    yield from parser.listas
@@ -0,0 +1,237 @@
+"""
+Prefiltro de sitios web antes de buscarles email.
+Resuelve el dominio (getaddrinfo asíncrono con timeout corto) y hace un GET
+que sigue redirecciones y lee solo el principio de la página, para separar:
+  vivo         responde con su propio dominio
+  redirige     responde desde otro dominio (se enriquece el destino)
+  estacionado  página de parking o dominio en venta
+  muerto       no resuelve, no conecta, timeout, 404/410 o 5xx
+Solo vivo y redirige pasan a la búsqueda de emails (HTTP + Chromium). Los
+resultados quedan en un cache SQLite con TTL por estado.
+
+    python prefiltro_web.py leads_plataformapyme.csv [--columna sitio_web] [--salida x.csv]
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import re
+import socket
+import sqlite3
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+import httpx
+from cache_emails import normalizar_dominio
+from grabacion import REPLAY, transporte_httpx
+from metricas import etapa, contar, contar_error
+
+RUTA_CACHE = "prefiltro_web.sqlite"
+
+VIVO, REDIRIGE, ESTACIONADO, MUERTO = "vivo", "redirige", "estacionado", "muerto"
+UTILES = {VIVO, REDIRIGE}       # los únicos que pasan al enriquecimiento
+TTL_DIAS = {VIVO: 30, REDIRIGE: 30, ESTACIONADO: 30, MUERTO: 3}
+DIA = 24 * 3600
+
+TIMEOUT_DNS = 3.0
+TIMEOUT_HTTP = httpx.Timeout(6.0, connect=3.0)
+BYTES_MUESTRA = 16 * 1024       # lo que se lee de la página para detectar parking
+CONCURRENCIA = 50               # sitios sondeados a la vez en modo lote
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "es-AR,es,en-US;q=0.9",
+}
+
+# Servicios de parking / venta de dominios
+HOSTS_PARKING = {"sedoparking.com", "sedo.com", "bodis.com", "parkingcrew.net", "dan.com", "afternic.com",
+                 "hugedomains.com", "above.com", "parklogic.com", "uniregistry.com", "undeveloped.com",
+                 "domainmarket.com", "sav.com", "buydomains.com", "namebright.com"}
+TEXTO_PARKING = re.compile(
+    r"this domain (is|may be) for sale|domain is parked|buy this domain|domain parking|parked free"
+    r"|este dominio (está|esta) (a la venta|en venta)|dominio (estacionado|en venta)"
+    r"|sedoparking|parkingcrew|bodis\.com", re.I)
+
+def url_base(sitio_web):
+    """'www.empresa.com.ar/contacto' → 'https://www.empresa.com.ar' (el primer sitio si hay varios)"""
+    partes = (sitio_web or "").split()
+    if not partes:
+        return ""
+    sitio = partes[0].rstrip(",;")
+    if "://" not in sitio:
+        sitio = "https://" + sitio
+    url = urlsplit(sitio)
+    return f"{url.scheme}://{url.netloc}" if url.hostname else ""
+
+def es_host_parking(host):
+    return any(host == h or host.endswith("." + h) for h in HOSTS_PARKING)
+
+async def resuelve(host):
+    """True si el host tiene alguna dirección (getaddrinfo en el pool de threads del loop)"""
+    try:
+        with etapa("prefiltro_dns"):
+            await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, 443, type=socket.SOCK_STREAM), TIMEOUT_DNS)
+        return True
+    except (OSError, UnicodeError, asyncio.TimeoutError):
+        return False
+
+async def sondear(cliente, url):
+    """GET siguiendo redirecciones, leyendo solo BYTES_MUESTRA → (status, url final, texto)"""
+    async with cliente.stream("GET", url) as r:
+        muestra = b""
+        async for trozo in r.aiter_bytes():
+            muestra += trozo
+            if len(muestra) >= BYTES_MUESTRA:
+                break
+        return r.status_code, r.url, muestra[:BYTES_MUESTRA].decode(r.encoding or "utf-8", errors="replace")
+
+async def clasificar_sitio(cliente, sitio_web):
+    """→ (estado, destino, detalle); destino es la base del sitio a enriquecer"""
+    base = url_base(sitio_web)
+    dominio = normalizar_dominio(base)
+    if not dominio:
+        return MUERTO, "", "sin dominio"
+    partes = urlsplit(base)
+    # En replay no hay DNS: el transporte manda todo al servidor local
+    if not REPLAY and not await resuelve(partes.hostname):
+        return MUERTO, "", "no resuelve"
+
+    # https primero; si no hay TLS en el sitio, http
+    error = ""
+    for url in (f"https://{partes.netloc}", f"http://{partes.netloc}"):
+        try:
+            with etapa("prefiltro_http", dominio):
+                status, final, muestra = await sondear(cliente, url)
+        except Exception as e:  # Conexión, TLS, timeout o URL inválida
+            contar_error("prefiltro_http", e)
+            error = "timeout" if isinstance(e, httpx.TimeoutException) else type(e).__name__
+            continue
+        contar("paginas")
+        destino = f"{final.scheme}://{final.netloc.decode()}"
+        if es_host_parking(final.host) or TEXTO_PARKING.search(muestra):
+            return ESTACIONADO, "", f"parking en {final.host}"
+        if status in (404, 410) or status >= 500:
+            return MUERTO, "", f"HTTP {status}"
+        if normalizar_dominio(final.host) != dominio:
+            return REDIRIGE, destino, f"redirige a {final.host}"
+        return VIVO, destino, f"HTTP {status}"
+    return MUERTO, "", error or "sin respuesta"
+
+def crear_cliente(conexiones=CONCURRENCIA):
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        follow_redirects=True,
+        timeout=TIMEOUT_HTTP,
+        transport=transporte_httpx(limits=httpx.Limits(max_connections=conexiones)),
+    )
+
+class PrefiltroWeb:
+    def __init__(self, ruta=RUTA_CACHE):
+        self.cliente = crear_cliente()
+        self.conteo = Counter()
+        self.hits = 0
+        self._en_curso = {}     # dominio → tarea, para no sondear dos veces el mismo sitio a la vez
+        self.db = sqlite3.connect(ruta)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS sitios (
+                dominio   TEXT PRIMARY KEY,
+                estado    TEXT NOT NULL,
+                destino   TEXT NOT NULL,
+                detalle   TEXT NOT NULL,
+                guardado  REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def obtener(self, dominio):
+        """(estado, destino, detalle) vigente en el cache, o None"""
+        fila = self.db.execute("SELECT estado, destino, detalle, guardado FROM sitios WHERE dominio = ?",
+                               (dominio,)).fetchone()
+        if fila and time.time() - fila[3] < TTL_DIAS.get(fila[0], 1) * DIA:
+            return fila[:3]
+        return None
+
+    def guardar(self, dominio, resultado):
+        self.db.execute("INSERT OR REPLACE INTO sitios (dominio, estado, destino, detalle, guardado) VALUES (?, ?, ?, ?, ?)",
+                        (dominio, *resultado, time.time()))
+        self.db.commit()
+
+    async def clasificar(self, sitio_web):
+        """(estado, destino, detalle) del sitio, del cache o sondeándolo"""
+        dominio = normalizar_dominio(url_base(sitio_web))
+        resultado = self.obtener(dominio) if dominio else None
+        if resultado:
+            self.hits += 1
+        else:
+            tarea = self._en_curso.get(dominio)
+            if tarea is None:
+                tarea = self._en_curso[dominio] = asyncio.create_task(clasificar_sitio(self.cliente, sitio_web))
+                tarea.add_done_callback(lambda _: self._en_curso.pop(dominio, None))
+                resultado = await tarea
+                if dominio:
+                    self.guardar(dominio, resultado)
+            else:
+                resultado = await tarea
+        self.conteo[resultado[0]] += 1
+        return resultado
+
+    async def clasificar_varios(self, sitios, concurrencia=CONCURRENCIA):
+        """{sitio: (estado, destino, detalle)} sondeando en paralelo"""
+        limite = asyncio.Semaphore(concurrencia)
+
+        async def uno(sitio):
+            async with limite:
+                return sitio, await self.clasificar(sitio)
+
+        return dict(await asyncio.gather(*(uno(s) for s in set(sitios))))
+
+    def resumen(self):
+        estados = ", ".join(f"{self.conteo[e]} {e}" for e in (VIVO, REDIRIGE, ESTACIONADO, MUERTO))
+        return f"{estados} ({self.hits} del cache)"
+
+    async def cerrar(self):
+        await self.cliente.aclose()
+        self.db.close()
+
+async def prefiltrar_csv(ruta, columna, salida, concurrencia):
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        lector = csv.DictReader(f)
+        campos = lector.fieldnames + ["web_estado", "web_destino", "web_detalle"]
+        filas = list(lector)
+    sitios = [fila.get(columna, "") for fila in filas if (fila.get(columna) or "").strip()]
+    print(f"🔎 {len(sitios)} filas con {columna} ({len(set(sitios))} sitios distintos)", flush=True)
+
+    prefiltro = PrefiltroWeb()
+    inicio = time.monotonic()
+    try:
+        resultados = await prefiltro.clasificar_varios(sitios, concurrencia)
+    finally:
+        await prefiltro.cerrar()
+
+    with open(salida, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=campos)
+        w.writeheader()
+        for fila in filas:
+            estado, destino, detalle = resultados.get(fila.get(columna, ""), ("", "", ""))
+            w.writerow({**fila, "web_estado": estado, "web_destino": destino, "web_detalle": detalle})
+    por_estado = Counter(estado for estado, _, _ in resultados.values())
+    print(f"✅ {len(resultados)} sitios en {time.monotonic() - inicio:.1f}s: " +
+          ", ".join(f"{por_estado[e]} {e}" for e in (VIVO, REDIRIGE, ESTACIONADO, MUERTO)), flush=True)
+    print(f"💾 {salida} ({por_estado[VIVO] + por_estado[REDIRIGE]} sitios para enriquecer)", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificar los sitios web de un CSV antes de enriquecerlos")
+    parser.add_argument("csv")
+    parser.add_argument("--columna", default="sitio_web")
+    parser.add_argument("--salida", help="por defecto <csv>_web.csv")
+    parser.add_argument("--concurrencia", type=int, default=CONCURRENCIA)
+    args = parser.parse_args()
+    salida = args.salida or os.path.splitext(args.csv)[0] + "_web.csv"
+    asyncio.run(prefiltrar_csv(args.csv, args.columna, salida, args.concurrencia))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Política de recursos para las sesiones de Playwright.
+Cada perfil define qué tipos de recurso se bloquean según para qué se usa
+la página; los trackers y widgets de chat se bloquean siempre. Los pedidos
+bloqueados se cuentan en BLOQUEADOS para el resumen de la corrida.
+"""
+
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Analytics, publicidad y widgets de terceros que nunca aportan datos
+HOSTS_TRACKERS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "facebook.net", "facebook.com/tr", "hotjar.com", "clarity.ms",
+    "tiktok.com", "analytics.", "tawk.to", "zopim.com", "zendesk.com", "intercom.io",
+    "crisp.chat", "jivosite.com", "hubspot.com", "hs-scripts.com", "onesignal.com",
+    "pusher.com", "youtube.com", "vimeo.com", "wa.me", "whatsapp",
+]
+
+PERFILES = {
+    # Maps necesita sus scripts, XHR y CSS (innerText depende de los estilos)
+    "maps":  {"image", "media", "font"},
+    # Sitios de empresas: solo se abren en el navegador si arman el HTML con JS,
+    # así que se dejan documento, scripts y XHR/fetch
+    "email": {"image", "media", "font", "stylesheet", "manifest", "texttrack", "eventsource", "websocket", "other"},
+    # DataTables de PlataformaPYME: documento, jQuery/DataTables y sus XHR
+    "pyme":  {"image", "media", "font", "stylesheet", "manifest", "other"},
+}
+
+BLOQUEADOS = Counter()
+
+def es_tracker(url):
+    partes = urlsplit(url)
+    direccion = partes.netloc + partes.path
+    return any(h in direccion for h in HOSTS_TRACKERS)
+
+async def aplicar_perfil(destino, perfil, contador=None):
+    """Intercepta los pedidos de una page o context según el perfil"""
+    tipos = PERFILES[perfil]
+    contador = BLOQUEADOS if contador is None else contador
+
+    async def manejar(route):
+        req = route.request
+        if req.resource_type in tipos:
+            contador[req.resource_type] += 1
+            await route.abort()
+        elif req.resource_type != "document" and es_tracker(req.url):
+            contador["tracker"] += 1
+            await route.abort()
+        else:
+            await route.fallback()  # Sigue a la red, o al replay de grabacion.py si lo hay
+
+    await destino.route("**/*", manejar)
+
+def resumen_bloqueos(contador=None):
+    contador = BLOQUEADOS if contador is None else contador
+    if not contador:
+        return "sin pedidos bloqueados"
+    detalle = ", ".join(f"{tipo} {n}" for tipo, n in contador.most_common())
+    return f"{sum(contador.values())} pedidos bloqueados ({detalle})"
@@ -0,0 +1,92 @@
+"""
+Control de ritmo adaptativo por host (AIMD), compartido por los scrapers.
+Mientras las respuestas llegan rápido y limpias la espera entre pedidos
+baja de a un paso fijo; ante un 429/5xx, una respuesta lenta, un error de
+red o una página de captcha se multiplica. Siempre se agrega jitter.
+Sirve tanto para hilos (esperar) como para asyncio (esperar_async).
+Con RITMO_SIN_ESPERAS=1 no duerme nunca (replay offline de los benchmarks).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+SIN_ESPERAS = os.environ.get("RITMO_SIN_ESPERAS") == "1"
+
+# Páginas de "tráfico inusual" / captcha (Google y genéricas)
+MARCAS_CAPTCHA = ["/sorry/", "unusual traffic", "tráfico inusual", "captcha-form", "are you a robot"]
+
+def host_de(url):
+    return urlsplit(url).netloc.lower() if "://" in url else url.lower()
+
+def es_captcha(url="", texto=""):
+    url, texto = (url or "").lower(), (texto or "")[:20000].lower()
+    return any(m in url or m in texto for m in MARCAS_CAPTCHA)
+
+class ControladorRitmo:
+    def __init__(self, espera_inicial=1.0, espera_min=0.2, espera_max=30.0,
+                 paso=0.05, factor=2.0, lenta=5.0, jitter=0.25):
+        self.espera_inicial = espera_inicial
+        self.espera_min = espera_min
+        self.espera_max = espera_max
+        self.paso = paso            # cuánto baja la espera con cada respuesta buena
+        self.factor = factor        # cuánto se multiplica ante una señal de saturación
+        self.lenta = lenta          # segundos a partir de los cuales una respuesta cuenta como lenta
+        self.jitter = jitter
+        self.hosts = {}             # host → {"espera": s, "proximo": t}
+        self.frenadas = 0
+        self.lock = threading.Lock()
+
+    def _estado(self, host):
+        return self.hosts.setdefault(host, {"espera": self.espera_inicial, "proximo": 0.0})
+
+    def _reservar(self, host):
+        """Reserva el próximo turno del host y devuelve cuánto hay que dormir"""
+        if SIN_ESPERAS:
+            return 0
+        with self.lock:
+            estado = self._estado(host_de(host))
+            ahora = time.monotonic()
+            turno = max(ahora, estado["proximo"])
+            espera = estado["espera"] * random.uniform(1 - self.jitter, 1 + self.jitter)
+            estado["proximo"] = turno + espera
+            return turno - ahora
+
+    def esperar(self, host):
+        demora = self._reservar(host)
+        if demora > 0:
+            time.sleep(demora)
+
+    async def esperar_async(self, host):
+        demora = self._reservar(host)
+        if demora > 0:
+            await asyncio.sleep(demora)
+
+    def registrar(self, host, status=None, duracion=None, url="", texto="", error=False, retry_after=None):
+        """Ajusta la espera del host según cómo respondió el último pedido"""
+        saturado = (
+            error
+            or status == 429
+            or (status is not None and status >= 500)
+            or (duracion is not None and duracion > self.lenta)
+            or es_captcha(url, texto)
+        )
+        with self.lock:
+            estado = self._estado(host_de(host))
+            if saturado:
+                self.frenadas += 1
+                estado["espera"] = min(self.espera_max, max(estado["espera"], self.espera_min) * self.factor)
+                if retry_after and str(retry_after).strip().isdigit():
+                    estado["espera"] = min(self.espera_max, max(estado["espera"], float(retry_after)))
+                    estado["proximo"] = max(estado["proximo"], time.monotonic() + estado["espera"])
+            else:
+                estado["espera"] = max(self.espera_min, estado["espera"] - self.paso)
+        return saturado
+
+    def resumen(self):
+        with self.lock:
+            esperas = ", ".join(f"{h} {e['espera']:.2f}s" for h, e in sorted(self.hosts.items()))
+        return f"{self.frenadas} frenadas | espera final: {esperas or '-'}"
@@ -0,0 +1,67 @@
+"""
+Escritura de CSV en streaming, compartida por los scrapers.
+Mantiene el archivo abierto y agrega solo las filas nuevas sobre
+'<salida>.parcial'; al cerrar sin errores lo renombra de forma atómica a
+la ruta final. Si el proceso muere, lo ya escrito queda en el .parcial y
+con continuar=True la próxima corrida sigue agregando sobre él.
+"""
+
+import csv
+import os
+
+def filas_previas(ruta):
+    """Filas ya escritas en el .parcial de una corrida interrumpida"""
+    parcial = ruta + ".parcial"
+    if not os.path.exists(parcial):
+        return []
+    with open(parcial, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+class EscritorCSV:
+    def __init__(self, ruta, campos, flush_cada=50, fsync_cada=500, continuar=False):
+        self.ruta = ruta
+        self.ruta_parcial = ruta + ".parcial"
+        self.flush_cada = flush_cada
+        self.fsync_cada = fsync_cada
+        self.filas = 0
+        if continuar and os.path.exists(self.ruta_parcial):
+            # Sin BOM: ya está al principio del archivo
+            self.f = open(self.ruta_parcial, "a", newline="", encoding="utf-8")
+            self.w = csv.DictWriter(self.f, fieldnames=campos, extrasaction="ignore")
+        else:
+            self.f = open(self.ruta_parcial, "w", newline="", encoding="utf-8-sig")
+            self.w = csv.DictWriter(self.f, fieldnames=campos, extrasaction="ignore")
+            self.w.writeheader()
+
+    def escribir(self, fila):
+        self.w.writerow(fila)
+        self.filas += 1
+        if self.fsync_cada and self.filas % self.fsync_cada == 0:
+            self.sincronizar()
+        elif self.flush_cada and self.filas % self.flush_cada == 0:
+            self.f.flush()
+
+    def escribir_varias(self, filas):
+        for fila in filas:
+            self.escribir(fila)
+
+    def sincronizar(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def cerrar(self, finalizar=True):
+        """Baja todo a disco y, si finalizar, reemplaza la salida final de una vez"""
+        if self.f.closed:
+            return
+        self.sincronizar()
+        self.f.close()
+        if finalizar:
+            os.replace(self.ruta_parcial, self.ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        # Con error se conserva el .parcial y no se pisa la salida anterior
+        self.cerrar(finalizar=tipo is None)
+        return False
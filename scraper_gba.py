@@ -3,23 +3,47 @@ Scraper - Catálogo Producción Bonaerense (GBA)
 https://www.mp.gba.gov.ar/catalogoproduccionbonaerense/
 Rubros: Alimentos, Indumentaria, Bebidas, etc.
 Guarda CSV progresivamente.
+Con --shard i/N solo se bajan las páginas de rubro que le tocan a este
+shard (la página 1 de cada rubro la bajan todos, para conocer la paginación).
 """
 
+import argparse
 import requests
-from bs4 import BeautifulSoup
-import csv
+from parser_html import crear_soup
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import re
 import time
-import random
 from datetime import datetime
+from salida_csv import EscritorCSV, filas_previas
+from estado_crawl import EstadoCrawl
+from ritmo import ControladorRitmo, host_de
+from leads_db import LeadStore, RUTA_DB
+from delta import CacheDelta
+from grabacion import adaptador_requests
+from shards import parsear as parsear_shard, le_toca, ruta_shard, describir
+import metricas
+from metricas import etapa, contar, contar_error
 
 BASE_URL = "https://www.mp.gba.gov.ar/catalogoproduccionbonaerense/rubros.php"
 OUTPUT   = "leads_gba_productores.csv"
+CAMPOS   = ["nombre","producto","email","telefono","lugar","rubro"]
+ESTADO   = OUTPUT + ".estado"   # páginas ya guardadas, para --resume
+DELTA    = "delta_gba.sqlite"   # ETag/hash y leads por página, para --delta
+DIFF     = "leads_gba_productores_diff.csv"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 }
 
+# Descarga concurrente; el ritmo lo ajusta ControladorRitmo según cómo responde el sitio.
+# Las esperas son del total contra el sitio: con --shard i/N cada proceso las
+# multiplica por N, así la matriz entera no pasa de ~2 pedidos por segundo.
+CONCURRENCIA = 6
+ESPERA_INICIAL = 1.0    # segundos entre pedidos al arrancar
+ESPERA_MIN = 0.5
+ESPERA_MAX = 20.0
+REINTENTOS = 3          # ante 429/5xx o error de red
+
 # Todos los rubros del sitio
 RUBROS = {
     1:  "Alimentos",
@@ -48,8 +72,7 @@ RUBROS = {
 def limpiar(t):
     return " ".join(t.split()).strip() if t else ""
 
-def parsear_pagina(html, rubro_nombre):
-    soup = BeautifulSoup(html, "html.parser")
+def parsear_pagina(soup, rubro_nombre):
     leads = []
 
     # Cada empresa es una card/div con h4
@@ -103,8 +126,7 @@ def parsear_pagina(html, rubro_nombre):
 
     return leads
 
-def get_total_paginas(html):
-    soup = BeautifulSoup(html, "html.parser")
+def get_total_paginas(soup):
     # Buscar el último número de página en la paginación
     paginas = []
     for a in soup.find_all("a"):
@@ -119,75 +141,204 @@ def get_total_paginas(html):
             paginas.append(int(t))
     return max(paginas) if paginas else 1
 
-def guardar_csv(leads):
-    if not leads:
-        return
-    campos = ["nombre","producto","email","telefono","lugar","rubro"]
-    with open(OUTPUT, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=campos)
-        w.writeheader()
-        w.writerows(leads)
-
-def scrape():
-    todos = []
-
-    for rubro_id, rubro_nombre in RUBROS.items():
-        print(f"\n📦 Rubro: {rubro_nombre} (ID {rubro_id})", flush=True)
-
-        # Primera página para detectar cuántas hay
+def crear_sesion():
+    """Sesión keep-alive con un pool de conexiones del tamaño de la concurrencia"""
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    adaptador = adaptador_requests(pool_connections=1, pool_maxsize=CONCURRENCIA)
+    s.mount("https://", adaptador)
+    s.mount("http://", adaptador)
+    return s
+
+def url_pagina(rubro_id, pag):
+    return f"{BASE_URL}?rubroActivo={rubro_id}" + (f"&pagina={pag}" if pag > 1 else "")
+
+def descargar(sesion, ritmo, rubro_id, pag, delta=None):
+    params = {"rubroActivo": rubro_id}
+    if pag > 1:
+        params["pagina"] = pag
+    cabeceras = delta.cabeceras(url_pagina(rubro_id, pag)) if delta else {}
+    for intento in range(1, REINTENTOS + 1):
+        ritmo.esperar(BASE_URL)
+        inicio = time.monotonic()
         try:
-            r = requests.get(BASE_URL, params={"rubroActivo": rubro_id}, headers=HEADERS, timeout=30)
-            r.raise_for_status()
-        except Exception as e:
-            print(f"   ❌ Error: {e}", flush=True)
+            with etapa("descarga", host_de(BASE_URL)):
+                r = sesion.get(BASE_URL, params=params, headers=cabeceras, timeout=30)
+        except requests.RequestException:
+            ritmo.registrar(BASE_URL, error=True)
+            if intento == REINTENTOS:
+                raise
             continue
+        saturado = ritmo.registrar(BASE_URL, status=r.status_code, duracion=time.monotonic() - inicio,
+                                   retry_after=r.headers.get("Retry-After"))
+        if saturado and (r.status_code == 429 or r.status_code >= 500) and intento < REINTENTOS:
+            continue
+        r.raise_for_status()
+        contar("paginas")
+        return r
 
-        total_pags = get_total_paginas(r.text)
-        print(f"   → {total_pags} páginas detectadas", flush=True)
-
-        leads_rubro = []
+def es_mia(rubro_id, pag, shard):
+    return le_toca(f"gba:{rubro_id}:{pag}", shard)
 
-        for pag in range(1, total_pags + 1):
-            try:
-                if pag == 1:
-                    html = r.text
+def scrape(escritor, estado, store, delta=None, shard=None):
+    """Descarga todas las páginas en paralelo y emite los leads en orden rubro/página"""
+    todos = []
+    sesion = crear_sesion()
+    n = shard[1] if shard else 1
+    ritmo = ControladorRitmo(ESPERA_INICIAL * n, ESPERA_MIN * n, max(ESPERA_MAX, ESPERA_MIN * n))
+
+    total_pags = {}     # rubro_id → páginas detectadas
+    resultados = {}     # (rubro_id, pag) → leads parseados (None si falló o ya estaba guardada)
+    rubros = [r for r in RUBROS if not estado.hecho(f"rubro:{r}")]
+    siguiente = 0       # índice del próximo rubro a emitir
+    if len(rubros) < len(RUBROS):
+        print(f"⏩ {len(RUBROS) - len(rubros)} rubros ya completos en la corrida anterior", flush=True)
+        if delta:
+            for rubro_id in set(RUBROS) - set(rubros):
+                delta.incompleto(rubro_id)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCIA) as pool:
+        futuros = {pool.submit(descargar, sesion, ritmo, rubro_id, 1, delta): (rubro_id, 1) for rubro_id in rubros}
+
+        while futuros:
+            hechos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                rubro_id, pag = futuros.pop(futuro)
+                rubro_nombre = RUBROS[rubro_id]
+                try:
+                    r = futuro.result()
+                except Exception as e:
+                    contar_error("pagina", e)
+                    if delta:
+                        delta.incompleto(rubro_id)
+                    if pag == 1:
+                        print(f"   ❌ {rubro_nombre}: {e}", flush=True)
+                        total_pags[rubro_id] = 0
+                    else:
+                        print(f"   ⚠️  {rubro_nombre} error página {pag}: {e}", flush=True)
+                        resultados[(rubro_id, pag)] = None
+                    continue
+
+                url = url_pagina(rubro_id, pag)
+                if delta and delta.sin_cambios(url, r):
+                    datos = delta.reutilizar(url)  # Igual que en la corrida anterior: no se parsea
                 else:
-                    resp = requests.get(
-                        BASE_URL,
-                        params={"rubroActivo": rubro_id, "pagina": pag},
-                        headers=HEADERS,
-                        timeout=30
-                    )
-                    resp.raise_for_status()
-                    html = resp.text
-
-                nuevos = parsear_pagina(html, rubro_nombre)
-                leads_rubro.extend(nuevos)
-                print(f"   📄 Pág {pag}/{total_pags} → {len(nuevos)} empresas | acumulado rubro: {len(leads_rubro)}", flush=True)
-
-                # Guardar progresivamente
-                todos.extend(nuevos)
-                guardar_csv(todos)
-
-                time.sleep(random.uniform(0.5, 1.5))
-
-            except Exception as e:
-                print(f"   ⚠️  Error página {pag}: {e}", flush=True)
-                continue
-
-        print(f"   ✅ {rubro_nombre}: {len(leads_rubro)} empresas totales", flush=True)
-
+                    try:
+                        with etapa("parseo"):  # Un error acá ya queda contado en la etapa
+                            soup = crear_soup(r.text)  # Un solo parseo por página
+                            datos = {"paginas": get_total_paginas(soup) if pag == 1 else 0,
+                                     "leads": parsear_pagina(soup, rubro_nombre)}
+                    except Exception as e:
+                        if delta:
+                            delta.incompleto(rubro_id)
+                        if pag == 1:
+                            print(f"   ❌ {rubro_nombre}: no se pudo parsear ({e})", flush=True)
+                            total_pags[rubro_id] = 0
+                        else:
+                            print(f"   ⚠️  {rubro_nombre} error parseando página {pag}: {e}", flush=True)
+                            resultados[(rubro_id, pag)] = None
+                        continue
+                    if delta:
+                        delta.guardar(url, rubro_id, r, datos)
+                if pag == 1:
+                    # Apenas se conoce la paginación se encolan el resto de las páginas
+                    total_pags[rubro_id] = datos["paginas"]
+                    for p in range(2, total_pags[rubro_id] + 1):
+                        if not es_mia(rubro_id, p, shard):
+                            resultados[(rubro_id, p)] = None   # La baja otro shard
+                            if delta:
+                                delta.incompleto(rubro_id)
+                        elif estado.hecho(f"pagina:{rubro_id}:{p}"):
+                            resultados[(rubro_id, p)] = None
+                            if delta:
+                                delta.incompleto(rubro_id)
+                        else:
+                            futuros[pool.submit(descargar, sesion, ritmo, rubro_id, p, delta)] = (rubro_id, p)
+                    if not es_mia(rubro_id, 1, shard):
+                        resultados[(rubro_id, pag)] = None
+                        if delta:
+                            delta.incompleto(rubro_id)
+                        continue
+                    if estado.hecho(f"pagina:{rubro_id}:1"):
+                        resultados[(rubro_id, pag)] = None
+                        continue
+                resultados[(rubro_id, pag)] = datos["leads"]
+
+            # Emitir en orden los rubros que ya están completos
+            while siguiente < len(rubros):
+                rubro_id = rubros[siguiente]
+                if rubro_id not in total_pags:
+                    break
+                paginas = range(1, total_pags[rubro_id] + 1)
+                if any((rubro_id, p) not in resultados for p in paginas):
+                    break
+                total = total_pags[rubro_id]
+                ok = [p for p in paginas if resultados[(rubro_id, p)] is not None]
+                mias = [p for p in paginas if es_mia(rubro_id, p, shard)]
+                leads_rubro = emitir_rubro(rubro_id, total, resultados)
+                with etapa("escritura"):
+                    escritor.escribir_varias(leads_rubro)  # Solo se agregan las filas nuevas
+                    escritor.sincronizar()
+                    for lead in leads_rubro:
+                        store.upsert("gba", lead, clave=f"{rubro_id}:{lead['nombre']}")
+                    store.commit()
+                for p in ok:
+                    estado.marcar(f"pagina:{rubro_id}:{p}")
+                if total and all(estado.hecho(f"pagina:{rubro_id}:{p}") for p in mias):
+                    estado.marcar(f"rubro:{rubro_id}")
+                todos.extend(leads_rubro)
+                siguiente += 1
+
+    print(f"\n⏱️  Ritmo: {ritmo.resumen()}", flush=True)
+    print(f"📈 Etapas: {metricas.resumen()}", flush=True)
     return todos
 
+def emitir_rubro(rubro_id, total, resultados):
+    rubro_nombre = RUBROS[rubro_id]
+    print(f"\n📦 Rubro: {rubro_nombre} (ID {rubro_id}) → {total} páginas", flush=True)
+    leads_rubro = []
+    for pag in range(1, total + 1):
+        nuevos = resultados.pop((rubro_id, pag))
+        if nuevos is None:
+            continue
+        leads_rubro.extend(nuevos)
+        print(f"   📄 Pág {pag}/{total} → {len(nuevos)} empresas | acumulado rubro: {len(leads_rubro)}", flush=True)
+    print(f"   ✅ {rubro_nombre}: {len(leads_rubro)} empresas totales", flush=True)
+    return leads_rubro
+
 def main():
+    parser = argparse.ArgumentParser(description="Scraper Catálogo Producción Bonaerense")
+    parser.add_argument("--resume", action="store_true", help="retomar una corrida interrumpida")
+    parser.add_argument("--delta", action="store_true", help="solo parsear las páginas que cambiaron y escribir el diff")
+    parser.add_argument("--shard", type=parsear_shard, help="i/N: bajar solo la parte i de N del catálogo")
+    args = parser.parse_args()
+    # Cada shard con sus propios archivos; después se unen con shards.py
+    output, estado_crawl, delta_db, diff = (ruta_shard(r, args.shard) for r in (OUTPUT, ESTADO, DELTA, DIFF))
+
     print("=" * 55, flush=True)
     print("🏭 SCRAPER CATÁLOGO GBA - Producción Bonaerense", flush=True)
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
     print(f"📋 {len(RUBROS)} rubros a scrapear", flush=True)
+    if args.shard:
+        print(f"🧩 {describir(args.shard)} → {output}", flush=True)
     print("=" * 55, flush=True)
 
-    leads = scrape()
-    guardar_csv(leads)
+    previos = filas_previas(output) if args.resume else []
+    if previos:
+        print(f"⏩ Reanudando: {len(previos)} productores ya guardados", flush=True)
+
+    estado = EstadoCrawl(estado_crawl, reanudar=args.resume)
+    store = LeadStore(ruta_shard(RUTA_DB, args.shard))
+    delta = CacheDelta(delta_db) if args.delta else None
+    with EscritorCSV(output, CAMPOS, continuar=args.resume) as escritor:
+        leads = previos + scrape(escritor, estado, store, delta, args.shard)
+    estado.terminar()
+    print(f"🗄️  Base de leads: {store.resumen()}", flush=True)
+    store.cerrar()
+    if delta:
+        cambios = delta.escribir_diff(diff, CAMPOS, clave=lambda l: (l["rubro"], l["nombre"]))
+        print(f"🔁 Delta: {delta.resumen()} | {len(cambios)} cambios → {diff}", flush=True)
+        delta.cerrar()
 
     print(f"\n{'='*55}", flush=True)
     print(f"📊 TOTAL: {len(leads)} productores", flush=True)
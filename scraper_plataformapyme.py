@@ -2,17 +2,34 @@
 Scraper - Directorio PlataformaPYME
 Todos los datos están en el HTML — no hay paginación real del servidor.
 DataTables solo muestra de a 30 pero el HTML tiene todo.
-No necesita navegador, solo requests + BeautifulSoup.
+Por defecto la tabla se parsea en streaming: las filas se escriben al CSV
+a medida que se descarga el documento. Con --delta se descarga entero para
+compararlo con la corrida anterior y, si no cambió, no se parsea.
+No necesita navegador, solo requests + BeautifulSoup (lxml si está instalado).
 """
 
+import argparse
 import requests
-from bs4 import BeautifulSoup
-import csv
-import re
+from parser_html import crear_soup, filas_tabla
+import codecs
 from datetime import datetime
+from salida_csv import EscritorCSV
+from campos_pyme import parsear_detalle
+from leads_db import LeadStore
+from delta import CacheDelta
+from grabacion import adaptador_requests
+import metricas
+from metricas import etapa, contar
+from ritmo import host_de
 
 URL = "https://www.plataformapyme.org/directorio-empresas"
 OUTPUT = "leads_plataformapyme.csv"
+CAMPOS = ["razon_social","cuit","categoria","localidad","provincia","domicilio","telefono","sitio_web","email"]
+DELTA  = "delta_pyme.sqlite"   # ETag/hash y leads del directorio, para --delta
+DIFF   = "leads_plataformapyme_diff.csv"
+
+STREAMING = True          # False: descargar y parsear el documento entero
+TAMANO_TROZO = 64 * 1024
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
@@ -21,83 +38,120 @@ HEADERS = {
 def limpiar(t):
     return " ".join(t.split()).strip() if t else ""
 
-def parsear_detalle(texto):
-    def campo(label):
-        m = re.search(rf"{label}:\s*(.+?)(?=Domicilio:|Localidad:|Provincia:|Teléfono:|Sitio Web:|Email:|Condicion Fiscal:|CUIT:|Categoria:|---|$)", texto, re.DOTALL)
-        return limpiar(m.group(1)) if m else ""
+def lead_desde_celdas(celdas):
+    """celdas: textos de cada <td> (el detalle con saltos de línea entre fragmentos)"""
+    campos = parsear_detalle(limpiar(celdas[0]))
     return {
-        "domicilio": campo("Domicilio"),
-        "provincia": campo("Provincia"),
-        "telefono":  campo("Teléfono"),
-        "sitio_web": campo("Sitio Web"),
-        "email":     campo("Email"),
-        "categoria": campo("Categoria"),
+        "razon_social": limpiar(celdas[1]),
+        "cuit":         limpiar(celdas[2]),
+        "categoria":    limpiar(celdas[3]) or campos["categoria"],
+        "localidad":    limpiar(celdas[4]),
+        "provincia":    campos["provincia"],
+        "domicilio":    campos["domicilio"],
+        "telefono":     campos["telefono"],
+        "sitio_web":    campos["sitio_web"],
+        "email":        campos["email"],
     }
 
-def guardar_csv(leads):
-    campos = ["razon_social","cuit","categoria","localidad","provincia","domicilio","telefono","sitio_web","email"]
-    with open(OUTPUT, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=campos)
-        w.writeheader()
-        w.writerows(leads)
-    print(f"💾 Guardado: {len(leads)} empresas → {OUTPUT}", flush=True)
-
-def scrape():
-    print("📥 Descargando HTML completo...", flush=True)
-    r = requests.get(URL, headers=HEADERS, timeout=60)
-    r.raise_for_status()
-
-    soup = BeautifulSoup(r.text, "html.parser")
+def leads_completo(r):
+    """Parsea el documento entero de una vez (modo anterior)"""
+    soup = crear_soup(r.text)
     tabla = soup.find("table")
     if not tabla:
-        print("❌ No se encontró la tabla")
-        return []
-
-    filas = tabla.find_all("tr")[1:]
-    print(f"✅ {len(filas)} filas encontradas en el HTML", flush=True)
-
-    leads = []
-    for i, fila in enumerate(filas):
+        return
+    for fila in tabla.find_all("tr")[1:]:
         celdas = fila.find_all("td")
         if len(celdas) < 5:
             continue
-
-        detalle  = limpiar(celdas[0].get_text(separator="\n"))
-        campos   = parsear_detalle(detalle)
-
-        lead = {
-            "razon_social": limpiar(celdas[1].get_text()),
-            "cuit":         limpiar(celdas[2].get_text()),
-            "categoria":    limpiar(celdas[3].get_text()) or campos["categoria"],
-            "localidad":    limpiar(celdas[4].get_text()),
-            "provincia":    campos["provincia"],
-            "domicilio":    campos["domicilio"],
-            "telefono":     campos["telefono"],
-            "sitio_web":    campos["sitio_web"],
-            "email":        campos["email"],
-        }
-        leads.append(lead)
-
-        # Mostrar progreso y guardar cada 100
-        if (i + 1) % 100 == 0:
-            print(f"   → {i+1} procesadas...", flush=True)
-            guardar_csv(leads)
-
-    return leads
+        textos = [celdas[0].get_text(separator="\n")] + [c.get_text() for c in celdas[1:]]
+        yield lead_desde_celdas(textos)
+
+def leads_streaming(r):
+    """Parsea las filas a medida que llegan los trozos de la respuesta"""
+    decodificador = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    trozos = (decodificador.decode(b) for b in r.iter_content(chunk_size=TAMANO_TROZO))
+    for i, fila in enumerate(filas_tabla(trozos)):
+        if i == 0 or len(fila) < 5:
+            continue  # encabezado o fila incompleta
+        textos = ["\n".join(fila[0])] + ["".join(c) for c in fila[1:]]
+        yield lead_desde_celdas(textos)
+
+def scrape(escritor, store, delta=None):
+    # En modo delta hace falta el documento entero para compararlo antes de parsear
+    streaming = STREAMING and not delta
+    cabeceras = {**HEADERS, **delta.cabeceras(URL)} if delta else HEADERS
+    modo = "en streaming" if streaming else "completo"
+    print(f"📥 Descargando HTML {modo}...", flush=True)
+    sesion = requests.Session()
+    sesion.mount("https://", adaptador_requests())
+    sesion.mount("http://", adaptador_requests())
+    with etapa("descarga", host_de(URL)):
+        r = sesion.get(URL, headers=cabeceras, timeout=60, stream=streaming)
+    with r:
+        r.raise_for_status()
+        contar("paginas")
+        sin_cambios = delta is not None and delta.sin_cambios(URL, r)
+        if sin_cambios:
+            print("⏩ El directorio no cambió desde la última corrida: no se parsea", flush=True)
+            generador = iter(delta.reutilizar(URL)["leads"])
+        else:
+            generador = leads_streaming(r) if streaming else leads_completo(r)
+
+        # Solo se guardan las filas si hacen falta para el delta: en streaming
+        # la memoria no crece con el tamaño del directorio
+        leads = [] if delta and not sin_cambios else None
+        totales = {"filas": 0, "email": 0, "telefono": 0, "sitio_web": 0}
+        with etapa("parseo_y_escritura"):
+            for i, lead in enumerate(generador):
+                if leads is not None:
+                    leads.append(lead)
+                totales["filas"] += 1
+                for campo in ("email", "telefono", "sitio_web"):
+                    totales[campo] += bool(lead[campo])
+                with etapa("escritura"):
+                    escritor.escribir(lead)
+                    store.upsert("pyme", lead)
+
+                # Mostrar progreso cada 100
+                if (i + 1) % 100 == 0:
+                    print(f"   → {i+1} procesadas...", flush=True)
+
+        if delta and not sin_cambios:
+            delta.guardar(URL, "directorio", r, {"leads": leads})
+
+    if not totales["filas"]:
+        print("❌ No se encontraron filas en la tabla", flush=True)
+    else:
+        print(f"✅ {totales['filas']} filas procesadas", flush=True)
+    print(f"📈 Etapas: {metricas.resumen()}", flush=True)
+    return totales
 
 def main():
+    parser = argparse.ArgumentParser(description="Scraper Directorio PlataformaPYME")
+    parser.add_argument("--delta", action="store_true", help="no parsear si el directorio no cambió y escribir el diff")
+    args = parser.parse_args()
+
     print("=" * 55, flush=True)
     print("🏭 SCRAPER PLATAFORMA PYME", flush=True)
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
     print("=" * 55, flush=True)
 
-    leads = scrape()
-    guardar_csv(leads)
+    store = LeadStore()
+    delta = CacheDelta(DELTA) if args.delta else None
+    with EscritorCSV(OUTPUT, CAMPOS) as escritor:
+        totales = scrape(escritor, store, delta)
+    print(f"💾 Guardado: {totales['filas']} empresas → {OUTPUT}", flush=True)
+    print(f"🗄️  Base de leads: {store.resumen()}", flush=True)
+    store.cerrar()
+    if delta:
+        cambios = delta.escribir_diff(DIFF, CAMPOS, clave=lambda l: l["cuit"] or l["razon_social"])
+        print(f"🔁 Delta: {delta.resumen()} | {len(cambios)} cambios → {DIFF}", flush=True)
+        delta.cerrar()
 
     print(f"\n{'='*55}", flush=True)
-    print(f"📊 TOTAL: {len(leads)} empresas", flush=True)
-    print(f"📧 Con email:    {sum(1 for l in leads if l['email'])}", flush=True)
-    print(f"📞 Con teléfono: {sum(1 for l in leads if l['telefono'])}", flush=True)
-    print(f"🌐 Con web:      {sum(1 for l in leads if l['sitio_web'])}", flush=True)
+    print(f"📊 TOTAL: {totales['filas']} empresas", flush=True)
+    print(f"📧 Con email:    {totales['email']}", flush=True)
+    print(f"📞 Con teléfono: {totales['telefono']}", flush=True)
+    print(f"🌐 Con web:      {totales['sitio_web']}", flush=True)
 
 main()
@@ -0,0 +1,149 @@
+"""
+Reparto del trabajo de un scraper entre varios procesos o jobs (--shard i/N).
+Cada unidad (página de un rubro, búsqueda de Maps) va al shard que indica
+un hash estable de su clave: no depende del orden, de la corrida ni del
+hash aleatorio de Python, así cada shard sabe solo qué le toca.
+Cada shard escribe sus propios archivos (<salida>.shard-i-de-N.csv, su
+leads.sqlite, su estado) y después se unen con dedup y orden estable:
+
+    python scraper_gba.py --shard 1/3      # ... y 2/3 y 3/3, en paralelo
+    python shards.py unir gba -n 3         # → leads_gba_productores.csv + leads.sqlite
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+from leads_db import LeadStore, RUTA_DB, normalizar_nombre
+
+# Salida de cada scraper, columnas que identifican una fila al unir y orden.
+# GBA reparte páginas, así que los shards no se pisan: solo se descarta una
+# fila idéntica (dos empresas homónimas del mismo rubro quedan las dos).
+# Maps sí puede ver el mismo lugar desde búsquedas de shards distintos: se
+# une por ID de lugar, o por nombre y dirección en CSVs sin esa columna.
+ESCENARIOS = {
+    "gba":  {"salida": "leads_gba_productores.csv", "clave": None, "orden": ("rubro", "nombre")},
+    "maps": {"salida": "leads_textil_argentina.csv", "clave": ("id_lugar",), "alternativa": ("nombre", "direccion"),
+             "orden": ("busqueda_origen", "nombre")},
+}
+
+def parsear(texto):
+    """'i/N' → (i, N) con 1 <= i <= N; para type= de argparse"""
+    try:
+        i, n = (int(x) for x in texto.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard inválido '{texto}': se espera i/N, por ejemplo 1/4")
+    if not 1 <= i <= n:
+        raise argparse.ArgumentTypeError(f"shard inválido '{texto}': i tiene que estar entre 1 y N")
+    return i, n
+
+def le_toca(clave, shard):
+    """True si la unidad de trabajo es de este shard (sin shard, todas)"""
+    if not shard:
+        return True
+    i, n = shard
+    h = int.from_bytes(hashlib.sha1(str(clave).encode("utf-8")).digest()[:8], "big")
+    return h % n == i - 1
+
+def ruta_shard(ruta, shard):
+    """leads.csv → leads.shard-2-de-4.csv (sin shard, la misma ruta)"""
+    if not shard:
+        return ruta
+    base, ext = os.path.splitext(ruta)
+    return f"{base}.shard-{shard[0]}-de-{shard[1]}{ext}"
+
+def describir(shard):
+    return f"shard {shard[0]}/{shard[1]}" if shard else "sin shards"
+
+def _normalizar(columna, valor):
+    valor = valor or ""
+    return normalizar_nombre(valor) if columna == "nombre" else " ".join(valor.split()).lower()
+
+def _clave(fila, columnas):
+    return tuple(_normalizar(c, fila.get(c)) for c in columnas)
+
+def unir_csv(rutas, destino, escenario):
+    """Une los CSV de los shards: una fila por clave (completando campos vacíos), en orden estable"""
+    campos, filas = None, {}
+    for ruta in rutas:
+        with open(ruta, newline="", encoding="utf-8-sig") as f:
+            lector = csv.DictReader(f)
+            campos = campos or lector.fieldnames
+            for fila in lector:
+                columnas = escenario["clave"] or campos
+                if not any(fila.get(c) for c in columnas):
+                    columnas = escenario.get("alternativa") or campos
+                clave = (tuple(columnas),) + _clave(fila, columnas)
+                previa = filas.get(clave)
+                if previa is None:
+                    filas[clave] = fila
+                else:
+                    for campo, valor in fila.items():
+                        if valor and not previa.get(campo):
+                            previa[campo] = valor
+    with open(destino, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=campos or [], extrasaction="ignore")
+        w.writeheader()
+        for fila in sorted(filas.values(), key=lambda f: (_clave(f, escenario["orden"]), _clave(f, campos))):
+            w.writerow(fila)
+    return len(filas)
+
+def unir_bases(rutas, destino=RUTA_DB):
+    """Vuelca los orígenes de cada base de shard en la base unificada, con su misma clave"""
+    store = LeadStore(destino)
+    for ruta in rutas:
+        origen = LeadStore(ruta)
+        for fila in origen.db.execute("SELECT fuente, clave, datos FROM origenes ORDER BY rowid"):
+            store.upsert(fila["fuente"], json.loads(fila["datos"]), clave=fila["clave"])
+        origen.cerrar()
+    resumen = store.resumen()
+    store.cerrar()
+    return resumen
+
+def unir(escenario, n, parcial=False):
+    salida = ESCENARIOS[escenario]["salida"]
+    rutas, faltan = [], []
+    for i in range(1, n + 1):
+        ruta = ruta_shard(salida, (i, n))
+        if not os.path.exists(ruta) and os.path.exists(ruta + ".parcial"):
+            print(f"⚠️  Shard {i}/{n} no terminó: se usa {ruta}.parcial", flush=True)
+            ruta += ".parcial"
+        if os.path.exists(ruta):
+            rutas.append(ruta)
+        else:
+            faltan.append(i)
+    if faltan and not parcial:
+        print(f"❌ Faltan los shards {faltan} de {n} (con --parcial se une lo que haya)", flush=True)
+        sys.exit(1)
+
+    total = unir_csv(rutas, salida, ESCENARIOS[escenario])
+    print(f"🧩 {len(rutas)} shards → {total} filas sin duplicar en {salida}", flush=True)
+    bases = [ruta_shard(RUTA_DB, (i, n)) for i in range(1, n + 1)]
+    bases = [b for b in bases if os.path.exists(b)]
+    if bases:
+        print(f"🗄️  Base de leads: {unir_bases(bases)}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Unir las salidas de una corrida repartida en shards")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_unir = sub.add_parser("unir", help="combinar los CSV y bases de los N shards")
+    p_unir.add_argument("escenario", choices=sorted(ESCENARIOS))
+    p_unir.add_argument("-n", "--shards", type=int, help="cantidad de shards (por defecto: la de los archivos encontrados)")
+    p_unir.add_argument("--parcial", action="store_true", help="unir aunque falte algún shard")
+    args = parser.parse_args()
+
+    n = args.shards
+    if not n:
+        base, ext = os.path.splitext(ESCENARIOS[args.escenario]["salida"])
+        encontrados = glob.glob(f"{base}.shard-*-de-*{ext}*")
+        if not encontrados:
+            print("❌ No hay salidas de shards en esta carpeta", flush=True)
+            sys.exit(1)
+        n = max(int(r.split("-de-")[1].split(".")[0]) for r in encontrados)
+    unir(args.escenario, n, args.parcial)
+
+if __name__ == "__main__":
+    main()